@@ -0,0 +1,63 @@
+"""
+Import time benchmark, guards `import django_tastypie_digester` against regressions.
+
+The package imports requests, which takes most of the time and varies a lot
+between machines, so only time of the package over `import requests`
+in the same interpreter is compared with the limit.
+
+Fails if the import takes longer than the limit or if it imports django.
+
+Usage: python benchmarks/import_time.py [limit_ms]
+"""
+import os
+import subprocess
+import sys
+
+PACKAGE = 'django_tastypie_digester'
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CODE = 'import sys, %s; print("django" in sys.modules)' % PACKAGE
+# Milliseconds of the package import over requests, about 2x of the measured 15 ms.
+LIMIT = 30.0
+
+
+def measure():
+    """
+    Imports the package in a fresh interpreter.
+
+    :returns: 3-tuple (float, float, bool), cumulative import time of the package and of requests
+        in ms and whether django was imported
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.environ.get('PYTHONPATH', '')]))
+    process = subprocess.Popen(
+        [sys.executable, '-X', 'importtime', '-c', CODE],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, universal_newlines=True
+    )
+    stdout, stderr = process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(stderr)
+    times = {}
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        columns = [column.strip() for column in line.split('|')]
+        if len(columns) == 3 and columns[2] in (PACKAGE, 'requests'):
+            times[columns[2]] = int(columns[1]) / 1000.0
+    if len(times) < 2:
+        raise RuntimeError('%s or requests import not found in:\n%s' % (PACKAGE, stderr))
+    return times[PACKAGE], times['requests'], stdout.strip() == 'True'
+
+
+def main():
+    limit = float(sys.argv[1]) if len(sys.argv) > 1 else LIMIT
+    results = [measure() for _ in range(9)]
+    milliseconds = min(result[0] - result[1] for result in results)
+    imports_django = any(result[2] for result in results)
+    print('import %s: %.1f ms' % (PACKAGE, min(result[0] for result in results)))
+    print('import requests: %.1f ms' % min(result[1] for result in results))
+    print('%s over requests: %.1f ms (limit %.1f ms)' % (PACKAGE, milliseconds, limit))
+    print('imports django: %s' % imports_django)
+    if imports_django or milliseconds > limit:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
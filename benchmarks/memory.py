@@ -0,0 +1,84 @@
+"""
+Memory benchmark of cached resources.
+
+Compares decoded rows kept as dicts (as resources kept them before)
+with Resource objects manufactured from the same rows.
+
+Usage: python benchmarks/memory.py [rows]
+"""
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+# Run from a checkout, the package does not have to be installed.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from django_tastypie_digester.core import Api, EndpointProxy
+
+SERVICE_URL = 'http://127.0.0.1:8000/api/v1/'
+
+
+def make_page(rows):
+    objects = []
+    for id in range(rows):
+        objects.append({
+            'id': id,
+            'email': 'mailing%s@example.com' % id,
+            'customer': '%08d' % id,
+            'kind': 'cms',
+            'created': '2014-01-01T00:00:00',
+            'user': '/api/v1/user/%s/' % (id % 100),
+            'resource_uri': '/api/v1/mailing/%s/' % id,
+        })
+    return json.dumps({'objects': objects})
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+class DictResource(object):
+    """Resource with instance __dict__ and its own data dict."""
+    def __init__(self, endpoint, data, id):
+        self.endpoint = endpoint
+        self._data = data
+        self._id = id
+        self._is_deleted = False
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    page = make_page(rows)
+    api = Api(SERVICE_URL, auth=('user', 'password'), load_endpoints=False)
+    endpoint = EndpointProxy(api, SERVICE_URL + 'mailing/', SERVICE_URL + 'mailing/schema/')
+
+    def build_dicts():
+        return [
+            DictResource(endpoint, item, item['resource_uri'].split('/')[-2])
+            for item in json.loads(page)['objects']
+        ]
+
+    def build_resources():
+        return endpoint.resource_class.manufacture_many(endpoint, json.loads(page)['objects'])
+
+    resources, dicts_size = measure(build_dicts)
+    del resources
+    resources, resources_size = measure(build_resources)
+    assert resources[1].email == 'mailing1@example.com'
+
+    print('rows: %s' % rows)
+    print('dict resources: %.1f MB, %d B/row' % (dicts_size / 1e6, dicts_size // rows))
+    print('slotted resources: %.1f MB, %d B/row' % (resources_size / 1e6, resources_size // rows))
+    print('saved: %.0f %%' % (100.0 * (dicts_size - resources_size) / dicts_size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark of resource url parsing on pages with many foreign keys.
+
+Compares Parser with the former startswith/split parsing.
+
+Usage: python benchmarks/parser.py [rows]
+"""
+import os
+import sys
+import timeit
+
+# Run from a checkout, the package does not have to be installed.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from django_tastypie_digester.core import Parser
+
+SERVICE_URL = 'http://127.0.0.1:8000/api/v1/'
+ENDPOINTS = ['mailing', 'user', 'profile', 'customer', 'campaign', 'template']
+
+
+class SplitParser(Parser):
+    """Former parsing, startswith and split of every value."""
+    def is_resource_url(self, url):
+        return isinstance(url, str) and url.startswith(self.base_path)
+
+    def get_resource_ident(self, url):
+        return url.split('/')[-3:-1]
+
+
+def make_page(rows):
+    objects = []
+    for id in range(rows):
+        item = {
+            'id': id,
+            'email': 'mailing%s@example.com' % id,
+            'kind': 'cms',
+        }
+        for name in ENDPOINTS[1:]:
+            item[name] = '/api/v1/%s/%s/' % (name, id % 500)
+        objects.append(item)
+    return objects
+
+
+def parse_page(parser, objects):
+    idents = []
+    for item in objects:
+        for value in item.values():
+            if parser.is_resource_url(value):
+                idents.append(parser.get_resource_ident(value))
+    return idents
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    objects = make_page(rows)
+    split_parser = SplitParser(SERVICE_URL)
+    parser = Parser(SERVICE_URL)
+    parser.set_endpoints(ENDPOINTS)
+    assert [tuple(ident) for ident in parse_page(split_parser, objects)] == parse_page(parser, objects)
+
+    print('rows: %s, foreign keys per row: %s' % (rows, len(ENDPOINTS) - 1))
+    for name, item in (('split', split_parser), ('parser', parser)):
+        seconds = min(timeit.repeat(lambda: parse_page(item, objects), number=1, repeat=5))
+        print('%s: %.1f ms' % (name, seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,961 @@
+"""
+Asyncio flavour of the client.
+
+E.g.
+    async with AsyncApi('http://127.0.0.1:8000/api/v1/', auth=('martin', '***')) as api:
+        mailing = await api.mailing.get(1)
+        user = await mailing.user
+        async for mailing in await api.mailing.filter(kind__contains='cms'):
+            ...
+
+Requires python 3.7+. The default transport requires aiohttp.
+"""
+
+import asyncio
+import contextvars
+from collections import deque
+from logging import getLogger
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from .buffers import WriteBuffer
+from .core import Api, EndpointProxy, Resource, ResourceChanges, ResourceList, ResourceProxy, ResourceProxyList
+from .exceptions import BatchWriteError, HttpError, ResourceDeleted, ResourceIdMissing, TooManyResources
+from .transports import TransportInterface
+
+# aiohttp is needed only by the default transport.
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = getLogger(__name__)
+
+# Write buffers entered by the running task, of all the apis.
+_write_buffers = contextvars.ContextVar('write_buffers', default=())
+
+
+def build_response(url, status_code, headers, content):
+    """
+    Builds requests response from raw response parts.
+
+    Async transports return requests responses, so they are handled
+    the same way as responses of the sync transports.
+
+    :returns: requests.models.Response
+    """
+    response = requests.models.Response()
+    response.url = url
+    response.status_code = status_code
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = content
+    return response
+
+
+class AsyncTransportInterface(TransportInterface):
+    """
+    Any custom async transport has to implement this api.
+
+    `request` is a coroutine returning requests.models.Response.
+    """
+    async def request(self, method, url, **kwargs):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class AiohttpTransport(AsyncTransportInterface):
+    """
+    Transport backed by aiohttp.ClientSession.
+
+    All the requests of one event loop share the connection pool.
+
+    :param: limit: int, how many connections can be open at once
+    :param: limit_per_host: int, how many connections can be open to one host, 0 is unlimited
+    :param: keep_alive: bool
+    :param: timeout: None|float, total timeout in seconds
+    """
+    def __init__(self, limit=100, limit_per_host=0, keep_alive=True, timeout=None):
+        if aiohttp is None:
+            raise ImportError('AiohttpTransport requires aiohttp')
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self._session = None
+
+    def _get_session(self):
+        """
+        Returns the session, creates it in the running loop on first use.
+
+        :returns: aiohttp.ClientSession
+        """
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                force_close=not self.keep_alive
+            )
+            kwargs = {}
+            if self.timeout is not None:
+                kwargs['timeout'] = aiohttp.ClientTimeout(total=self.timeout)
+            self._session = aiohttp.ClientSession(connector=connector, **kwargs)
+        return self._session
+
+    async def request(self, method, url, auth=None, **kwargs):
+        """
+        Does the request.
+
+        :returns: requests.models.Response
+        """
+        if isinstance(auth, tuple):
+            auth = aiohttp.BasicAuth(*auth)
+        async with self._get_session().request(method.upper(), url, auth=auth, **kwargs) as response:
+            content = await response.read()
+            return build_response(str(response.url), response.status, response.headers, content)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+async def _read_ahead(iterable, size):
+    """
+    Iterates async `iterable` in a background task, at most `size` items ahead of the consumer.
+
+    Exceptions of the background iteration are raised to the consumer.
+
+    :yields: mixed
+    """
+    queue = asyncio.Queue(maxsize=size)
+    done = object()
+
+    async def produce():
+        try:
+            async for item in iterable:
+                await queue.put((item, None))
+        except Exception as e:
+            await queue.put((done, e))
+        else:
+            await queue.put((done, None))
+
+    task = asyncio.ensure_future(produce())
+    try:
+        while True:
+            item, error = await queue.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        task.cancel()
+
+
+class AsyncResourceProxy(ResourceProxy):
+    """
+    Proxy to not evaluated resource, resolved by awaiting it.
+
+    E.g. await (await api.mailing.get(1)).user
+    """
+    __slots__ = ()
+
+    def __await__(self):
+        return self._fetch().__await__()
+
+    def __getattr__(self, attr):
+        """
+        Returns property of already resolved resource.
+
+        :raises: AttributeError
+        :returns: mixed
+        """
+        if attr in ResourceProxy.__slots__:
+            raise AttributeError(attr)
+        if self._resource is None:
+            raise AttributeError('%s (%r is not resolved, await it first)' % (attr, self))
+        return getattr(self._resource, attr)
+
+    async def _fetch(self):
+        """
+        Returns, possibly fetches resource.
+        """
+        if self._resource is None:
+            self._resource = await self._endpoint.get(self._id)
+        return self._resource
+
+    @classmethod
+    async def fetch_many(cls, proxies):
+        """
+        Resolves not evaluated proxies in batches, batches are fetched concurrently.
+
+        :param: proxies: iterable(AsyncResourceProxy)
+        """
+        groups = {}
+        for proxy in proxies:
+            if proxy._resource is None:
+                groups.setdefault(proxy._endpoint.resource_name, []).append(proxy)
+        for group in groups.values():
+            endpoint = group[0]._endpoint
+            ids = sorted(set(proxy._id for proxy in group))
+            resources = dict([item async for item in endpoint.iter_many(ids, ResourceProxyList.MAX_WORKERS)])
+            for proxy in group:
+                proxy._resource = resources.get(proxy._id)
+
+
+class AsyncResourceProxyList(ResourceProxyList):
+    """
+    List of AsyncResourceProxy, iterated by `async for`.
+
+    E.g.
+        async for mailing in (await api.user.get(1)).mailings:
+            ...
+    """
+    def __iter__(self):
+        raise TypeError('%r can be iterated only by async for' % self)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        """
+        Iterates resources, fetches them page by page if not fetched before.
+
+        :yields: AsyncResource
+        """
+        if self._is_cached:
+            for id in self._ids:
+                yield self._cache[id]
+            return
+        async for id, resource in self._endpoint.iter_many(self._ids, self.MAX_WORKERS):
+            self._cache[id] = resource
+            yield resource
+        self._is_cached = True
+
+    def __getitem__(self, item):
+        """
+        Returns awaitable single resource.
+
+        :returns: coroutine
+        """
+        return self._get_item(str(item))
+
+    async def _get_item(self, item):
+        if item not in self._ids:
+            raise KeyError(item)
+        if item not in self._cache:
+            self._cache[item] = await self._endpoint.get(item)
+        return self._cache[item]
+
+
+class AsyncResourceList(ResourceList):
+    """
+    Resource list, iterated by `async for`.
+
+    E.g.
+        async for mailing in await api.mailing.filter(...):
+            ...
+    """
+    def __iter__(self):
+        raise TypeError('%r can be iterated only by async for' % self)
+
+    def __aiter__(self):
+        return self._fetch()
+
+    async def _manufacture_page(self, objects):
+        """
+        Manufactures page resources and prefetches their related resources.
+
+        :param: objects: list
+        :returns: list(AsyncResource)
+        """
+        resources = self.endpoint.resource_class.manufacture_many(self.endpoint, objects)
+        for field in self._prefetch:
+            await AsyncResourceProxy.fetch_many(
+                value for value in (getattr(item, field, None) for item in resources)
+                if isinstance(value, AsyncResourceProxy)
+            )
+        return resources
+
+    async def _iterate_pages(self):
+        """
+        Iterates pages, possibly reading them ahead in a background task.
+
+        The cursor moves when the consumer asks for the next page.
+
+        :yields: list(AsyncResource)
+        """
+        self._rewind()
+        pages = self._follow_pages()
+        if self._read_ahead:
+            pages = _read_ahead(pages, self._read_ahead)
+        async for offset, resources in pages:
+            yield resources
+            self._offset = offset
+
+    async def _follow_pages(self):
+        """
+        Iterates pages following `next` links.
+
+        :yields: 2-tuple (None|int, list(AsyncResource)), offset of the next page and resources
+        """
+        objects = self._pop_first_page()
+        if objects is not None:
+            data = {'meta': self._meta, 'objects': objects}
+        else:
+            data = await self.endpoint.api.get(self.resource_name, **self._filters)
+        while True:
+            objects, offset = self._clip_page(data['meta'], data['objects'])
+            next = data['meta'].get('next')
+            resources = await self._manufacture_page(objects)
+            data = objects = None
+            yield offset, resources
+            if offset is None:
+                return
+            data = await self.endpoint.api.get_by_relative_url(next)
+
+    async def _fetch(self):
+        """
+        Used by iteration. Fetches all resources page by page, unless cached.
+
+        :yields: AsyncResource
+        """
+        if self._is_cached:
+            for item in list(self._cache):
+                yield item
+            return
+        self._is_cached = True
+        async for resources in self._iterate_pages():
+            self._cache += resources
+            for item in resources:
+                yield item
+
+    async def stream(self):
+        """
+        Iterates resources page by page without caching them.
+
+        :yields: AsyncResource
+        """
+        async for resources in self._iterate_pages():
+            for item in resources:
+                yield item
+
+    async def iter_parallel(self, workers=8, ordered=True):
+        """
+        Iterates resources fetching pages concurrently.
+
+        At most `workers` pages are requested at once or waiting for the consumer,
+        so a slow consumer does not pile them up in memory.
+        Resources are not cached, the cursor moves only when all of them are iterated.
+
+        :param: workers: int
+        :param: ordered: bool, whether to yield pages in order or as they arrive
+        :yields: AsyncResource
+        """
+        limit = int(self._meta.get('limit') or 0)
+        if not limit:
+            # Unlimited page, everything is on the first one.
+            async for resources in self._iterate_pages():
+                for item in resources:
+                    yield item
+            return
+        self._rewind()
+        filters, offsets = self._get_page_offsets(limit)
+        start = offsets[0] if offsets else None
+        first_page = self._pop_first_page()
+
+        async def fetch_page(offset):
+            if offset == start and first_page is not None:
+                objects = first_page
+            else:
+                data = await self.endpoint.api.get(self.resource_name, offset=offset, limit=limit, **filters)
+                objects = data['objects']
+            if self._end is not None:
+                objects = objects[:max(0, self._end - offset)]
+            return await self._manufacture_page(objects)
+
+        offsets = iter(offsets)
+        tasks = set()
+        pending = deque()
+
+        def submit():
+            for offset in offsets:
+                task = asyncio.ensure_future(fetch_page(offset))
+                tasks.add(task)
+                pending.append(task)
+                return
+
+        try:
+            for _ in range(workers):
+                submit()
+            while pending:
+                if ordered:
+                    task = pending.popleft()
+                    await task
+                else:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    task = done.pop()
+                    pending.remove(task)
+                tasks.discard(task)
+                resources = task.result()
+                submit()
+                for item in resources:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+        self._offset = None
+
+
+class AsyncResourceChanges(ResourceChanges):
+    """
+    Resources changed since a high-water mark, iterated by `async for`.
+
+    E.g.
+        changes = api.mailing.changes_since(field='modified', **saved_mark)
+        async for mailing in changes:
+            ...
+    """
+    def __iter__(self):
+        raise TypeError('%r can be iterated only by async for' % self)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        """
+        Iterates changed resources.
+
+        :yields: AsyncResource
+        """
+        endpoint = self.endpoint
+        while not self._is_done:
+            data = await endpoint.api.get(endpoint.resource_name, **self._get_filters())
+            objects, marks = self._consume_page(data)
+            for resource, mark in zip(endpoint.resource_class.manufacture_many(endpoint, objects), marks):
+                yield resource
+                self._move_mark(mark)
+
+
+class AsyncResource(Resource):
+    """
+    Resource with awaitable update and delete.
+
+    E.g. await (await api.mailing.get(1)).update(customer='999')
+    """
+    __slots__ = ()
+    proxy_class = AsyncResourceProxy
+    proxy_list_class = AsyncResourceProxyList
+
+    async def update(self, **kwargs):
+        """
+        Updates resources by PATCH request and returns updated resource.
+
+        Inside api.batch() the update is buffered and PendingWrite is returned.
+
+        :keyword params: resource fields
+        :raises: BadHttpStatus if returned status is not 202
+        :returns: AsyncResource|PendingWrite
+        """
+        if self._is_deleted:
+            raise ResourceDeleted
+        write_buffer = self.endpoint.api._write_buffer
+        if write_buffer is not None:
+            return await write_buffer.update(self.endpoint, self._id, kwargs)
+        url = self.get_url()
+        headers = {'content-type': 'application/json'}
+        response = await self.endpoint.api.request(url, method='patch', data=self.endpoint.api.encode_body(kwargs), headers=headers)
+        logger.debug('Patching data: %s' % kwargs)
+        if response.status_code != 202:
+            self.endpoint.api.raise_error(response)
+        self.endpoint._forget(self._id)
+        resource = self.endpoint._manufacture_written(response, self._id)
+        if resource is not None:
+            return resource
+        return await self.endpoint.get(self._id)
+
+    async def delete(self):
+        """
+        Deletes resource by DELETE request.
+
+        Inside api.batch() the delete is buffered and PendingWrite is returned.
+
+        :raises: BadHttpStatus if returned status is not 204
+        :returns: True|PendingWrite
+        """
+        if self._is_deleted:
+            raise ResourceDeleted
+        write_buffer = self.endpoint.api._write_buffer
+        if write_buffer is not None:
+            self._is_deleted = True
+            return await write_buffer.delete(self.endpoint, self._id)
+        url = self.get_url()
+        response = await self.endpoint.api.request(url, method='delete')
+        if response.status_code != 204:
+            self.endpoint.api.raise_error(response)
+        self.endpoint._forget(self._id)
+        self._is_deleted = True
+        return True
+
+
+class AsyncEndpointProxy(EndpointProxy):
+    """
+    Proxy to resource endpoint with awaitable methods.
+
+    E.g. api.mailing
+    """
+    resource_class = AsyncResource
+    list_class = AsyncResourceList
+    changes_class = AsyncResourceChanges
+
+    async def get_schema(self):
+        """
+        Returns endpoint schema, from the api schema cache if there is one.
+
+        :returns: dict
+        """
+        return await self.api.get_schema_by_absolute_url(self.get_schema_url())
+
+    async def get(self, id=None, **kwargs):
+        """
+        Returns one resource.
+
+        Specified by id or by django QuerySet filter attributes.
+
+        :raises: BadHttpStatus if returned status is not 200
+        :returns: AsyncResource
+        """
+        if id:
+            resource = None if kwargs else self._recall(id)
+            if resource is not None:
+                return resource
+            data = await self.api.get(self.resource_name, id, **kwargs)
+            resource = self.resource_class.manufacture(self, data)
+            self._remember([resource])
+            return resource
+        if not kwargs:
+            raise ResourceIdMissing
+        list_proxy = await self.filter(**kwargs)
+        if list_proxy.count() != 1:
+            raise TooManyResources
+        return [item async for item in list_proxy][0]
+
+    async def get_many(self, *ids, **kwargs):
+        """
+        Returns more resources.
+
+        Specified by ids.
+
+        :raises: BadHttpStatus if returned status is not 200
+        :returns: dict(str(resource id): AsyncResource)
+        """
+        resources, ids = self._recall_many(ids)
+        if resources and not ids:
+            return resources
+        id = 'set/' + ';'.join(map(str, ids))
+        data = await self.api.get(self.resource_name, id)
+        return self._collect_many(resources, data)
+
+    async def _fetch_chunk(self, ids):
+        """
+        Fetches resources of `ids` by get_many.
+
+        :returns: list(2-tuple (str, None|AsyncResource)) in the order of ids
+        """
+        resources = {}
+        for resource in (await self.get_many(*ids)).values():
+            if resource is not None:
+                resources[resource._id] = resource
+        return [(id, resources.get(id)) for id in ids]
+
+    async def iter_many(self, ids, workers=1):
+        """
+        Iterates resources specified by ids in their order.
+
+        Ids are fetched in chunks (see chunk_ids), `workers` chunks at once.
+
+        :raises: BadHttpStatus if returned status is not 200
+        :yields: 2-tuple (str(resource id), None|AsyncResource)
+        """
+        semaphore = asyncio.Semaphore(max(workers, 1))
+
+        async def fetch_chunk(chunk):
+            async with semaphore:
+                return await self._fetch_chunk(chunk)
+
+        tasks = [asyncio.ensure_future(fetch_chunk(chunk)) for chunk in self.chunk_ids(ids)]
+        try:
+            for task in tasks:
+                for item in await task:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def all(self):
+        """
+        Returns all resources list.
+
+        :returns: AsyncResourceList
+        """
+        return await self.filter()
+
+    async def filter(self, **kwargs):
+        """
+        Returns filtered resources list.
+
+        Specified by django QuerySet filter attributes.
+
+        :raises: BadHttpStatus if returned status is not 200
+        :returns: AsyncResourceList
+        """
+        data = await self.api.get(self.resource_name, **kwargs)
+        return self.list_class(self, data['meta'], kwargs, data['objects'])
+
+    async def resume(self, cursor):
+        """
+        Returns resources list continuing at cursor of another, possibly deserialized, ResourceList.
+
+        :raises: BadHttpStatus if returned status is not 200
+        :returns: AsyncResourceList
+        """
+        filters = self._get_cursor_filters(cursor)
+        data = await self.api.get(self.resource_name, **filters)
+        return self.list_class(self, data['meta'], filters, data['objects'], end=cursor['end'])
+
+    async def count(self, **kwargs):
+        """
+        Returns count of resources matching the filter.
+
+        :raises: BadHttpStatus if returned status is not 200
+        :returns: int
+        """
+        kwargs['limit'] = 1
+        data = await self.api.get(self.resource_name, **kwargs)
+        return int(data['meta']['total_count'])
+
+    async def add(self, **kwargs):
+        """
+        Adds resource to this endpoint and returns it.
+
+        Inside api.batch() the add is buffered and PendingWrite is returned.
+
+        :raises: BadHttpStatus if returned status is not 201
+        :returns: AsyncResource|PendingWrite
+        """
+        if self.api._write_buffer is not None:
+            return await self.api._write_buffer.add(self, kwargs)
+        url = self.get_url()
+        headers = {'content-type': 'application/json'}
+        response = await self.api.request(url, method='post', data=self.api.encode_body(kwargs), headers=headers)
+        logger.debug('Posting data: %s' % kwargs)
+        if response.status_code != 201:
+            self.api.raise_error(response)
+        location = response.headers['location']
+        resource = self._manufacture_written(response, self.api.parser.get_resource_ident(location)[1])
+        if resource is not None:
+            return resource
+        data = await self.api.get_by_absolute_url(location)
+        return self.resource_class.manufacture(self, data)
+
+    async def _patch_list(self, objects, deleted_objects):
+        """
+        Issues PATCH to endpoint url, TastyPie creates or updates `objects` and deletes `deleted_objects`.
+
+        :raises: BadHttpStatus if returned status is not 202
+        :returns: list(AsyncResource) if the api returns data (always_return_data), otherwise []
+        """
+        data = {'objects': objects}
+        if deleted_objects:
+            data['deleted_objects'] = deleted_objects
+        url = self.get_url()
+        headers = {'content-type': 'application/json'}
+        response = await self.api.request(url, method='patch', data=self.api.encode_body(data), headers=headers)
+        logger.debug('Patching list: %s objects, %s deleted objects' % (len(objects), len(deleted_objects)))
+        if response.status_code != 202:
+            self.api.raise_error(response)
+        data = self.api.decode_body(response)
+        if not data or 'objects' not in data:
+            return []
+        return self.resource_class.manufacture_many(self, data['objects'])
+
+    async def _bulk_patch(self, objects=(), deleted_objects=()):
+        """
+        Issues list PATCH requests of at most BULK_ROWS objects, one after another.
+
+        :returns: list(AsyncResource) if the api returns data (always_return_data), otherwise []
+        """
+        objects = list(objects)
+        deleted_objects = list(deleted_objects)
+        resources = []
+        for offset in range(0, len(objects), self.BULK_ROWS):
+            resources += await self._patch_list(objects[offset:offset + self.BULK_ROWS], [])
+        for offset in range(0, len(deleted_objects), self.BULK_ROWS):
+            await self._patch_list([], deleted_objects[offset:offset + self.BULK_ROWS])
+        return resources
+
+    async def bulk_add(self, objects):
+        """
+        Adds more resources to this endpoint by list PATCH requests.
+
+        :raises: BadHttpStatus if returned status is not 202
+        :returns: list(AsyncResource) if the api returns data (always_return_data), otherwise []
+        """
+        return await self._bulk_patch(objects=objects)
+
+    async def bulk_update(self, changes):
+        """
+        Updates more resources of this endpoint by list PATCH requests.
+
+        :raises: BadHttpStatus if returned status is not 202
+        :returns: list(AsyncResource) if the api returns data (always_return_data), otherwise []
+        """
+        # The sync implementation builds the objects and returns the _bulk_patch coroutine.
+        return await super(AsyncEndpointProxy, self).bulk_update(changes)
+
+    async def bulk_delete(self, *ids):
+        """
+        Deletes more resources of this endpoint by list PATCH requests.
+
+        :raises: BadHttpStatus if returned status is not 202
+        :returns: True
+        """
+        await self._bulk_patch(deleted_objects=self._get_deleted_objects(ids))
+        return True
+
+
+class AsyncWriteBuffer(WriteBuffer):
+    """
+    Write buffer of AsyncApi, entered by `async with`, buffered writes are awaited.
+
+    E.g.
+        async with api.batch(flush_every=500):
+            async for mailing in await api.mailing.all():
+                await mailing.update(customer='999')
+    """
+    TRANSPORT_ERRORS = WriteBuffer.TRANSPORT_ERRORS + (asyncio.TimeoutError,) + (
+        (aiohttp.ClientError,) if aiohttp is not None else ()
+    )
+
+    def __enter__(self):
+        raise TypeError('%r can be entered only by async with' % self)
+
+    async def __aenter__(self):
+        self.api._push_write_buffer(self)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.api._pop_write_buffer(self)
+        await self.flush()
+        # Do not hide the exception raised in the block.
+        if self.errors and exc_type is None:
+            raise BatchWriteError('%s buffered writes failed' % len(self.errors), errors=self.errors)
+
+    async def add(self, endpoint, fields):
+        pending = self._add(endpoint, fields)
+        if self._should_flush():
+            await self.flush()
+        return pending
+
+    async def update(self, endpoint, id, fields):
+        pending = self._update(endpoint, id, fields)
+        if self._should_flush():
+            await self.flush()
+        return pending
+
+    async def delete(self, endpoint, id):
+        pending = self._delete(endpoint, id)
+        if self._should_flush():
+            await self.flush()
+        return pending
+
+    async def flush(self):
+        """
+        Writes buffered writes, chunk after chunk, see WriteBuffer.flush.
+
+        :returns: list(PendingWrite), failed writes of this flush
+        """
+        failed = []
+        for endpoint, chunk in self._take_chunks():
+            failed += await self._write_chunk(endpoint, chunk)
+        self.errors += failed
+        return failed
+
+    async def _write_chunk(self, endpoint, chunk):
+        """
+        Writes one chunk by one list PATCH request, see WriteBuffer._write_chunk.
+
+        :returns: list(PendingWrite), failed writes
+        """
+        written, objects, deleted_objects = self._get_request_data(endpoint, chunk)
+        try:
+            resources = await endpoint._patch_list(objects, deleted_objects)
+        except HttpError as e:
+            logger.debug('Buffered write of %s %s failed: %s' % (len(chunk), endpoint.resource_name, e))
+            if self._can_split(chunk):
+                half = len(chunk) // 2
+                return await self._write_chunk(endpoint, chunk[:half]) + await self._write_chunk(endpoint, chunk[half:])
+            return self._fail(chunk, e)
+        except self.TRANSPORT_ERRORS as e:
+            logger.debug('Buffered write of %s %s failed: %s' % (len(chunk), endpoint.resource_name, e))
+            return self._fail(chunk, e)
+        return self._succeed(endpoint, chunk, written, resources)
+
+
+class AsyncApi(Api):
+    """
+    The asyncio TastyPie client.
+
+    Endpoints are loaded by `await api.load_endpoints()` or when entering `async with`.
+
+    E.g.
+        async with AsyncApi('http://127.0.0.1:8000/api/v1/', auth=('martin', '***')) as api:
+            ...
+    """
+    endpoint_class = AsyncEndpointProxy
+
+    def __init__(self, service_url, transport=None, load_endpoints=True, **kwargs):
+        """
+        :param service_url: native_string_bases
+        :param transport: None|AsyncTransportInterface
+            transport used for all the HTTP requests, AiohttpTransport by default
+        :param load_endpoints: bool
+            whether to load endpoints when entering `async with`
+        :param kwargs: **dict
+            the other Api parameters
+        """
+        transport = transport or AiohttpTransport()
+        assert isinstance(transport, AsyncTransportInterface)
+        super(AsyncApi, self).__init__(service_url, transport=transport, load_endpoints=False, **kwargs)
+        self._load_endpoints = load_endpoints
+
+    async def __aenter__(self):
+        if self._load_endpoints:
+            await self.load_endpoints()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _push_write_buffer(self, buffer):
+        _write_buffers.set(_write_buffers.get() + (buffer,))
+
+    def _pop_write_buffer(self, buffer):
+        _write_buffers.set(tuple(item for item in _write_buffers.get() if item is not buffer))
+
+    @property
+    def _write_buffer(self):
+        """
+        Returns write buffer of this api active in the running task.
+
+        :returns: None|AsyncWriteBuffer
+        """
+        for buffer in reversed(_write_buffers.get()):
+            if buffer.api is self:
+                return buffer
+        return None
+
+    def batch(self, flush_every=500, flush_interval=None):
+        """
+        Returns async context manager buffering adds, updates and deletes into list PATCH requests.
+
+        The buffer is active only in the task which entered it and in tasks it starts.
+
+        E.g.
+        async with api.batch(flush_every=500):
+            await (await api.mailing.get(1)).update(customer='999')
+
+        :raises: BatchWriteError on exit if some of the writes failed
+        :returns: AsyncWriteBuffer
+        """
+        return AsyncWriteBuffer(self, flush_every=flush_every, flush_interval=flush_interval)
+
+    async def load_endpoints(self):
+        """
+        Loads endpoints (TastyPie feature), from the schema cache if there is one.
+        """
+        endpoints = await self.get_schema_by_absolute_url(self.get_url())
+        self._endpoint_proxies = {}
+        self.parser.set_endpoints(endpoints)
+        self._endpoints = endpoints
+
+    async def request(self, url, method='get', data=None, headers=None):
+        """
+        Does the request through the transport.
+
+        Waits for the rate limiter and retries failed request by the retry policy, if there are any.
+
+        :returns: requests.models.Response
+        """
+        policy = self._retry_policy
+        attempt = 0
+        while True:
+            if self._rate_limiter is not None:
+                await asyncio.sleep(self._rate_limiter.reserve())
+            try:
+                response = await self._transport.request(method, url, auth=self._request_auth, data=data, headers=headers, **self._request_kwargs)
+            except Exception as e:
+                if policy is None or not policy.should_retry(method, attempt, error=e):
+                    raise
+                delay = policy.get_delay(attempt)
+                logger.debug('Retrying %s %s in %.2fs: %s' % (method, url, delay, e))
+            else:
+                if policy is None or not policy.should_retry(method, attempt, response=response):
+                    return response
+                delay = policy.get_delay(attempt, response)
+                logger.debug('Retrying %s %s in %.2fs: [%s]' % (method, url, delay, response.status_code))
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def close(self):
+        """
+        Releases pooled connections held by the transport.
+        """
+        await self._transport.close()
+
+    async def get_by_absolute_url(self, url):
+        """
+        Does GET request by url and if successful, decodes it.
+
+        :returns: dict
+        """
+        cached, headers = self._get_cached_response(url)
+        response = await self.request(url, headers=headers)
+        return self._decode_response(url, response, cached)
+
+    async def get_schema_by_absolute_url(self, url):
+        """
+        Returns endpoint list or schema by url, from the schema cache if there is one.
+
+        :returns: dict
+        """
+        if self._schema_cache is None:
+            return await self.get_by_absolute_url(url)
+        data = self._schema_cache.get(self.parser.url, url)
+        if data is None:
+            data = await self.get_by_absolute_url(url)
+            self._schema_cache.set(self.parser.url, url, data)
+        return data
+
+    async def get_by_relative_url(self, url):
+        """
+        Does GET request by relative url and if successful, decodes it.
+
+        :returns: dict
+        """
+        url = '%s%s' % (self.parser.base_url, url)
+        return await self.get_by_absolute_url(url)
+
+    async def get(self, resource_name=None, resource_id=None, **kwargs):
+        """
+        Does GET request by resource name and id and if successful, decodes it.
+
+        :returns: dict
+        """
+        url = self.get_url(resource_name, resource_id, **kwargs)
+        return await self.get_by_absolute_url(url)
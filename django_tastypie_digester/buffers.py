@@ -0,0 +1,283 @@
+"""Write buffers"""
+
+import threading
+import time
+from logging import getLogger
+
+import requests
+
+from .exceptions import BatchWriteError, HttpError
+
+logger = getLogger(__name__)
+
+
+class PendingWrite(object):
+    """
+    Buffered add, update or delete of one resource.
+
+    After flush, `done` is True and `error` holds the exception of a failed write.
+    `resource` holds the written resource if the api returns data (always_return_data).
+
+    :param: endpoint: EndpointProxy
+    :param: id: None|native_string_bases, None for added resources
+    :param: fields: dict
+    """
+    def __init__(self, endpoint, id, fields):
+        self.endpoint = endpoint
+        self.id = id
+        self.fields = fields
+        self.deleted = False
+        self.done = False
+        self.error = None
+        self.resource = None
+
+    def __repr__(self):
+        if self.id is None:
+            action = 'add'
+        else:
+            action = 'delete' if self.deleted else 'update'
+        return '<%s %s %s/%s>' % (
+            self.__class__.__name__,
+            action,
+            self.endpoint.resource_name,
+            self.id if self.id is not None else ''
+        )
+
+
+class WriteBuffer(object):
+    """
+    Collects adds, updates and deletes and writes them by list PATCH requests.
+
+    Repeated updates of one resource are merged. Buffered writes are flushed
+    when there are `flush_every` of them, when `flush_interval` seconds passed
+    since the last flush (checked on every write) and on exit.
+
+    E.g.
+        with api.batch(flush_every=500):
+            for mailing in api.mailing.all():
+                mailing.update(customer='999')
+
+    :param: api: Api
+    :param: flush_every: int
+    :param: flush_interval: None|float
+    """
+    # Errors of a failed request besides HttpError, they fail only the written chunk.
+    TRANSPORT_ERRORS = (requests.RequestException,)
+
+    def __init__(self, api, flush_every=500, flush_interval=None):
+        self.api = api
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.errors = []
+        self._pending = []
+        self._updates = {}
+        self._lock = threading.RLock()
+        self._flushed_at = time.time()
+
+    def __enter__(self):
+        self.api._push_write_buffer(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.api._pop_write_buffer(self)
+        self.flush()
+        # Do not hide the exception raised in the block.
+        if self.errors and exc_type is None:
+            raise BatchWriteError('%s buffered writes failed' % len(self.errors), errors=self.errors)
+
+    def add(self, endpoint, fields):
+        """
+        Buffers add of a new resource.
+
+        :returns: PendingWrite
+        """
+        with self._lock:
+            pending = self._add(endpoint, fields)
+            if self._should_flush():
+                self.flush()
+            return pending
+
+    def update(self, endpoint, id, fields):
+        """
+        Buffers update of a resource, merges it with the pending update of the same resource.
+
+        :returns: PendingWrite
+        """
+        with self._lock:
+            pending = self._update(endpoint, id, fields)
+            if self._should_flush():
+                self.flush()
+            return pending
+
+    def delete(self, endpoint, id):
+        """
+        Buffers delete of a resource, drops the pending update of the same resource.
+
+        :returns: PendingWrite
+        """
+        with self._lock:
+            pending = self._delete(endpoint, id)
+            if self._should_flush():
+                self.flush()
+            return pending
+
+    def _add(self, endpoint, fields):
+        pending = PendingWrite(endpoint, None, dict(fields))
+        self._pending.append(pending)
+        return pending
+
+    def _update(self, endpoint, id, fields):
+        key = (endpoint.resource_name, id)
+        pending = self._updates.get(key)
+        if pending is None or pending.deleted:
+            pending = PendingWrite(endpoint, id, {})
+            self._updates[key] = pending
+            self._pending.append(pending)
+        pending.fields.update(fields)
+        endpoint._forget(id)
+        return pending
+
+    def _delete(self, endpoint, id):
+        key = (endpoint.resource_name, id)
+        pending = self._updates.get(key)
+        if pending is None:
+            pending = PendingWrite(endpoint, id, {})
+            self._updates[key] = pending
+            self._pending.append(pending)
+        pending.deleted = True
+        pending.fields = {}
+        endpoint._forget(id)
+        return pending
+
+    def _should_flush(self):
+        """
+        Returns whether there are `flush_every` buffered writes or `flush_interval` passed.
+
+        :returns: bool
+        """
+        if len(self._pending) >= self.flush_every:
+            return True
+        return self.flush_interval is not None and time.time() - self._flushed_at >= self.flush_interval
+
+    def flush(self):
+        """
+        Writes buffered writes, endpoint after endpoint in chunks of EndpointProxy.BULK_ROWS.
+
+        Adds are written in other chunks than updates and deletes, so that a failed add
+        does not fail updates and deletes and the other way round.
+
+        Failed writes are collected in `errors`, a failed request, also for transport errors
+        like timeouts, does not stop writing of the other chunks.
+
+        :returns: list(PendingWrite), failed writes of this flush
+        """
+        failed = []
+        for endpoint, chunk in self._take_chunks():
+            failed += self._write_chunk(endpoint, chunk)
+        self.errors += failed
+        return failed
+
+    def _take_chunks(self):
+        """
+        Empties the buffer and splits its writes into chunks written by one request.
+
+        :returns: list(2-tuple (EndpointProxy, list(PendingWrite)))
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._updates = {}
+            self._flushed_at = time.time()
+        groups = {}
+        for item in pending:
+            groups.setdefault((item.endpoint.resource_name, item.id is None), []).append(item)
+        chunks = []
+        for group in groups.values():
+            endpoint = group[0].endpoint
+            for offset in range(0, len(group), endpoint.BULK_ROWS):
+                chunks.append((endpoint, group[offset:offset + endpoint.BULK_ROWS]))
+        return chunks
+
+    def _write_chunk(self, endpoint, chunk):
+        """
+        Writes one chunk by one list PATCH request.
+
+        TastyPie does not report which object of the request failed, so a failed chunk
+        of updates and deletes is split in halves and they are written again, until
+        the failed writes are found one by one. They can be written again safely even if
+        the failed request was partly applied. Adds could be duplicated, so all the adds
+        of a failed chunk are reported failed.
+
+        :returns: list(PendingWrite), failed writes
+        """
+        written, objects, deleted_objects = self._get_request_data(endpoint, chunk)
+        try:
+            resources = endpoint._patch_list(objects, deleted_objects)
+        except HttpError as e:
+            logger.debug('Buffered write of %s %s failed: %s' % (len(chunk), endpoint.resource_name, e))
+            if self._can_split(chunk):
+                half = len(chunk) // 2
+                return self._write_chunk(endpoint, chunk[:half]) + self._write_chunk(endpoint, chunk[half:])
+            return self._fail(chunk, e)
+        except self.TRANSPORT_ERRORS as e:
+            logger.debug('Buffered write of %s %s failed: %s' % (len(chunk), endpoint.resource_name, e))
+            return self._fail(chunk, e)
+        return self._succeed(endpoint, chunk, written, resources)
+
+    def _get_request_data(self, endpoint, chunk):
+        """
+        Returns list PATCH data of the chunk.
+
+        :returns: 3-tuple (list(PendingWrite), list(dict), list(str)),
+            added or updated writes, their objects and uris of deleted resources
+        """
+        written = []
+        objects = []
+        deleted_objects = []
+        for item in chunk:
+            if item.deleted:
+                deleted_objects.append(endpoint.get_resource_uri(item.id))
+                continue
+            fields = dict(item.fields)
+            if item.id is not None:
+                fields['resource_uri'] = endpoint.get_resource_uri(item.id)
+            written.append(item)
+            objects.append(fields)
+        return written, objects, deleted_objects
+
+    def _can_split(self, chunk):
+        """
+        Returns whether failed chunk can be split and written again, only updates and deletes can.
+
+        :returns: bool
+        """
+        return len(chunk) > 1 and chunk[0].id is not None
+
+    def _succeed(self, endpoint, chunk, written, resources):
+        """
+        Marks writes of the chunk done, updates the identity map.
+
+        :returns: list(PendingWrite), no failed writes
+        """
+        # The resources could be cached again by a get between buffering and flush.
+        for item in chunk:
+            if item.id is not None:
+                endpoint._forget(item.id)
+        # Returned data are in the order of sent objects.
+        if len(resources) == len(written):
+            for item, resource in zip(written, resources):
+                item.resource = resource
+            endpoint._remember(resources)
+        for item in chunk:
+            item.done = True
+        return []
+
+    def _fail(self, chunk, error):
+        """
+        Marks writes of the chunk failed with `error`.
+
+        :returns: list(PendingWrite), failed writes
+        """
+        for item in chunk:
+            item.done = True
+            item.error = error
+        return chunk
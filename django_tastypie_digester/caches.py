@@ -0,0 +1,336 @@
+"""Caches"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+# os.replace is not available in python 2.
+_replace_file = getattr(os, 'replace', os.rename)
+
+
+class IdentityMap(object):
+    """
+    Per Api cache of resources keyed by (resource name, resource id).
+
+    Least recently used resources are evicted when there are more than `max_size` of them.
+    Resources older than `ttl` seconds are treated as missing.
+
+    :param: max_size: int
+    :param: ttl: None|float
+    """
+    def __init__(self, max_size=10000, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, resource_name, resource_id):
+        """
+        Returns cached resource or None.
+
+        :returns: None|Resource
+        """
+        key = (resource_name, str(resource_id))
+        with self._lock:
+            item = self._items.pop(key, None)
+            if item is None:
+                return None
+            stored, resource = item
+            if self.ttl is not None and time.time() - stored > self.ttl:
+                return None
+            # Re-insert to mark as recently used.
+            self._items[key] = item
+            return resource
+
+    def set(self, resource_name, resource_id, resource):
+        """
+        Stores resource, evicts the least recently used ones over max_size.
+        """
+        key = (resource_name, str(resource_id))
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = (time.time(), resource)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, resource_name, resource_id):
+        """
+        Removes resource from the cache.
+        """
+        with self._lock:
+            self._items.pop((resource_name, str(resource_id)), None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+# Decoded response payload with its HTTP validators.
+# Payloads are shared between cache hits and have to be treated as read only.
+CachedResponse = namedtuple('CachedResponse', ['etag', 'last_modified', 'payload'])
+
+
+class ResponseCacheInterface(object):
+    """
+    Any custom response cache has to implement this api.
+    """
+    def get(self, url):
+        raise NotImplementedError
+
+    def set(self, url, response):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryResponseCache(ResponseCacheInterface):
+    """
+    In-memory response cache.
+
+    Least recently used responses are evicted when there are more than `max_entries` of them.
+
+    :param: max_entries: int
+    """
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        """
+        :returns: None|CachedResponse
+        """
+        with self._lock:
+            response = self._items.pop(url, None)
+            if response is not None:
+                self._items[url] = response
+            return response
+
+    def set(self, url, response):
+        assert isinstance(response, CachedResponse)
+        with self._lock:
+            self._items.pop(url, None)
+            self._items[url] = response
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class SqliteResponseCache(ResponseCacheInterface):
+    """
+    On-disk response cache stored in sqlite database.
+
+    Payloads are stored as JSON. Payloads of custom serializers with other types
+    are pickled only if `allow_pickle`, otherwise they are not cached, as anyone
+    who can write the database file could run code by a pickled payload.
+    Least recently used responses are evicted when there are more than `max_entries` of them.
+
+    :param: path: str, database file path
+    :param: max_entries: int
+    :param: allow_pickle: bool, whether to store and load pickled payloads
+    """
+    # Payload prefixes of the storage formats.
+    JSON = b'j'
+    PICKLE = b'p'
+
+    def __init__(self, path, max_entries=10000, allow_pickle=False):
+        # Imported on first use, only few users need it and it slows down the package import.
+        import sqlite3
+        self.max_entries = max_entries
+        self.allow_pickle = allow_pickle
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS responses '
+                '(url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, payload BLOB, accessed REAL)'
+            )
+            self._connection.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+
+    def get(self, url):
+        """
+        :returns: None|CachedResponse
+        """
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                'SELECT etag, last_modified, payload FROM responses WHERE url = ?', (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute('UPDATE responses SET accessed = ? WHERE url = ?', (time.time(), url))
+        etag, last_modified, payload = row
+        payload = self._load(bytes(payload))
+        if payload is None:
+            return None
+        return CachedResponse(etag, last_modified, payload)
+
+    def _load(self, payload):
+        """
+        Loads stored payload, rows of other formats, e.g. pickled ones when pickle is not allowed, are ignored.
+
+        :returns: None|mixed
+        """
+        kind, payload = payload[:1], payload[1:]
+        if kind == self.JSON:
+            return json.loads(payload.decode('utf-8'))
+        if kind == self.PICKLE and self.allow_pickle:
+            import pickle
+            return pickle.loads(payload)
+        return None
+
+    def _dump(self, payload):
+        """
+        Dumps payload to JSON, pickles it if it is not JSON serializable and pickle is allowed.
+
+        :returns: None|bytes, None if the payload cannot be stored
+        """
+        try:
+            return self.JSON + json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        except (TypeError, ValueError) as e:
+            if not self.allow_pickle:
+                logger.debug('Response is not cached, payload is not JSON serializable: %s' % e)
+                return None
+        import pickle
+        return self.PICKLE + pickle.dumps(payload, pickle.HIGHEST_PROTOCOL)
+
+    def set(self, url, response):
+        assert isinstance(response, CachedResponse)
+        payload = self._dump(response.payload)
+        if payload is None:
+            return
+        import sqlite3
+        payload = sqlite3.Binary(payload)
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO responses (url, etag, last_modified, payload, accessed) VALUES (?, ?, ?, ?, ?)',
+                (url, response.etag, response.last_modified, payload, time.time())
+            )
+            count, = self._connection.execute('SELECT COUNT(*) FROM responses').fetchone()
+            if count > self.max_entries:
+                self._connection.execute(
+                    'DELETE FROM responses WHERE url IN (SELECT url FROM responses ORDER BY accessed LIMIT ?)',
+                    (count - self.max_entries,)
+                )
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM responses')
+
+
+class SchemaCache(object):
+    """
+    Cache of endpoint lists and schemas, kept in process and optionally on disk.
+
+    Entries are stored per service url, so different apis (and api versions)
+    never share them, and expire after `ttl` seconds. In-process entries are shared
+    by all the instances. On-disk entries are stored in one JSON file per service url
+    in `path` directory, so they survive restarts of short-lived processes.
+
+    Cached data are shared between hits and have to be treated as read only.
+
+    :const: VERSION: version of the on-disk format, files of other versions are ignored
+    :param: path: None|str, directory of the on-disk cache
+    :param: ttl: None|float
+    """
+    VERSION = 1
+    _entries = {}
+    _loaded_files = set()
+    _lock = threading.Lock()
+
+    def __init__(self, path=None, ttl=3600):
+        self.path = path
+        self.ttl = ttl
+
+    def get(self, service_url, url):
+        """
+        Returns cached endpoint list or schema or None.
+
+        :returns: None|dict
+        """
+        with self._lock:
+            entry = self._load(service_url).get(url)
+        if entry is None:
+            return None
+        stored, data = entry
+        if self.ttl is not None and time.time() - stored > self.ttl:
+            return None
+        return data
+
+    def set(self, service_url, url, data):
+        """
+        Stores endpoint list or schema, writes the on-disk cache.
+        """
+        with self._lock:
+            entries = self._load(service_url)
+            entries[url] = (time.time(), data)
+            self._dump(service_url, entries)
+
+    def clear(self):
+        """
+        Removes in-process entries of all the service urls and on-disk entries in `path`.
+        """
+        with self._lock:
+            for service_url in self._entries:
+                file_path = self._get_file_path(service_url)
+                if file_path is not None and os.path.exists(file_path):
+                    os.remove(file_path)
+            self._entries.clear()
+            self._loaded_files.clear()
+
+    def _get_file_path(self, service_url):
+        if self.path is None:
+            return None
+        digest = hashlib.sha1(service_url.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, 'schemas-%s.json' % digest)
+
+    def _load(self, service_url):
+        """
+        Returns in-process entries of service url, reads them from disk on first call.
+
+        :returns: dict(str, 2-tuple (float, dict))
+        """
+        entries = self._entries.setdefault(service_url, {})
+        file_path = self._get_file_path(service_url)
+        if file_path is not None and file_path not in self._loaded_files:
+            self._loaded_files.add(file_path)
+            try:
+                with open(file_path) as f:
+                    content = json.load(f)
+            except (IOError, OSError, ValueError):
+                return entries
+            if content.get('version') == self.VERSION and content.get('service_url') == service_url:
+                for url, (stored, data) in content['entries'].items():
+                    entries.setdefault(url, (stored, data))
+        return entries
+
+    def _dump(self, service_url, entries):
+        """
+        Writes entries of service url to disk, atomically by renaming a temporary file.
+        """
+        file_path = self._get_file_path(service_url)
+        if file_path is None:
+            return
+        content = {'version': self.VERSION, 'service_url': service_url, 'entries': entries}
+        try:
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            import tempfile
+            fd, temp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(content, f)
+            _replace_file(temp_path, file_path)
+        except (IOError, OSError) as e:
+            logger.debug('Schema cache %s was not written: %s' % (file_path, e))
@@ -1,28 +1,131 @@
+from collections import deque
 from logging import getLogger
-from math import ceil
+import re
+import threading
+import time
+import warnings
 
 
 import sys
 if sys.version_info.major == 3:
-    from urllib.parse import urlsplit
+    from urllib.parse import urlsplit, urlencode
+    from queue import Queue, Full
+    from sys import intern
 
     native_string_bases = (str, bytes)
 else:
     from urlparse import urlsplit
+    from urllib import urlencode
+    from Queue import Queue, Full
 
     native_string_bases = (basestring,)
 
 
-import urllib
-import json
 import requests
 from requests.auth import AuthBase
-from .serializers import JsonSerializer, SerializerInterface, JsonLazyEncoder
+from .serializers import JsonSerializer, SerializerInterface
+from .transports import SessionTransport, TransportInterface
+from .caches import IdentityMap, CachedResponse, ResponseCacheInterface, SchemaCache
+from .buffers import WriteBuffer
+from .policies import RateLimiter, RetryPolicy
 from .exceptions import BadHttpStatus, ResourceIdMissing, TooManyResources,\
     ResourceDeleted
 
 logger = getLogger(__name__)
 
+# Api.request used to take requests functions instead of method names.
+_LEGACY_REQUESTS = dict((getattr(requests, method), method) for method in (
+    'get', 'head', 'options', 'post', 'put', 'patch', 'delete'
+))
+
+
+def _read_ahead(iterable, size):
+    """
+    Iterates `iterable` in a background thread, at most `size` items ahead of the consumer.
+
+    Exceptions of the background iteration are raised to the consumer.
+
+    :yields: mixed
+    """
+    queue = Queue(maxsize=size)
+    stopped = threading.Event()
+    done = object()
+
+    def put(item):
+        # Give up when the consumer has stopped iterating.
+        while not stopped.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as e:
+            put((done, e))
+        else:
+            put((done, None))
+
+    thread = threading.Thread(target=produce)
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            item, error = queue.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stopped.set()
+
+
+def _imap_bounded(pool, func, items, size, ordered=True):
+    """
+    Maps `func` over `items` in `pool`, at most `size` calls are running or waiting for the consumer.
+
+    Exceptions of the calls are raised to the consumer.
+
+    :param: ordered: bool, whether to yield results in order of items or as they are finished
+    :yields: mixed
+    """
+    items = iter(items)
+    pending = deque()
+    finished = Queue()
+
+    def call(item):
+        try:
+            result = func(item), None
+        except Exception as e:
+            result = None, e
+        if not ordered:
+            finished.put(result)
+        return result
+
+    def submit():
+        for item in items:
+            pending.append(pool.apply_async(call, (item,)))
+            return
+
+    for _ in range(size):
+        submit()
+    while pending:
+        if ordered:
+            result, error = pending.popleft().get()
+        else:
+            pending.popleft()
+            result, error = finished.get()
+        if error is not None:
+            raise error
+        submit()
+        yield result
+
 
 class ResourceProxy(object):
     """
@@ -36,6 +139,8 @@ class ResourceProxy(object):
     :param: endpoint: EndpointProxy
     :param: id: native_string_bases
     """
+    __slots__ = ('_endpoint', '_id', '_resource')
+
     def __init__(self, endpoint, id):
         assert isinstance(endpoint, EndpointProxy)
         assert isinstance(id, native_string_bases)
@@ -62,6 +167,9 @@ class ResourceProxy(object):
         :raises: AttributeError
         :returns: mixed
         """
+        if attr in ResourceProxy.__slots__:
+            # Not initialized slot, e.g. while unpickling.
+            raise AttributeError(attr)
         return getattr(self._fetch(), attr)
 
     def _fetch(self):
@@ -85,7 +193,27 @@ class ResourceProxy(object):
         assert isinstance(url, native_string_bases)
         name, id = api.parser.get_resource_ident(url)
         endpoint = api.get_endpoint(name)
-        return ResourceProxy(endpoint, id)
+        return cls(endpoint, id)
+
+    @classmethod
+    def fetch_many(cls, proxies):
+        """
+        Resolves not evaluated proxies in batches.
+
+        Proxies are grouped by endpoint, distinct ids are fetched by EndpointProxy.iter_many.
+
+        :param: proxies: iterable(ResourceProxy)
+        """
+        groups = {}
+        for proxy in proxies:
+            if proxy._resource is None:
+                groups.setdefault(proxy._endpoint.resource_name, []).append(proxy)
+        for group in groups.values():
+            endpoint = group[0]._endpoint
+            ids = sorted(set(proxy._id for proxy in group))
+            resources = dict(endpoint.iter_many(ids, ResourceProxyList.MAX_WORKERS))
+            for proxy in group:
+                proxy._resource = resources.get(proxy._id)
 
 
 class ResourceProxyList(object):
@@ -96,11 +224,11 @@ class ResourceProxyList(object):
 
     E.g. api.user.get(1).mailings
 
-    :const: PAGE_ROWS: How many records should fetch on one page on evaluation.
+    :const: MAX_WORKERS: How many pages can be fetched at once on evaluation.
     :param: endpoint: EndpointProxy
     :param: ids: list
     """
-    PAGE_ROWS = 20
+    MAX_WORKERS = 4
 
     def __init__(self, endpoint, ids):
         assert isinstance(endpoint, EndpointProxy)
@@ -118,7 +246,10 @@ class ResourceProxyList(object):
 
         :yields: Resource
         """
-        generator = self._cache.itervalues() if self._is_cached else self._fetch()
+        if self._is_cached:
+            generator = (self._cache[id] for id in self._ids)
+        else:
+            generator = self._fetch()
         for item in generator:
             yield item
 
@@ -146,19 +277,16 @@ class ResourceProxyList(object):
 
     def _fetch(self):
         """
-        Fetches resources page by page.
+        Fetches resources page by page, pages are fetched concurrently.
+
+        Resources are yielded in the order of ids, None for not found ones.
 
         :yields: Resource
         """
+        for id, resource in self._endpoint.iter_many(self._ids, self.MAX_WORKERS):
+            self._cache[id] = resource
+            yield resource
         self._is_cached = True
-        pages_count = int(ceil(len(self._ids) / self.PAGE_ROWS))
-        for page_num in range(pages_count):
-            offset = page_num * self.PAGE_ROWS
-            onset = offset + self.PAGE_ROWS
-            ids_slice = self._ids[offset:onset]
-            for key, val in self._endpoint.get_many(*ids_slice).iteritems():
-                self._cache[key] = val
-                yield val
 
     @classmethod
     def manufacture(cls, api, data):
@@ -178,7 +306,7 @@ class ResourceProxyList(object):
             name, id = api.parser.get_resource_ident(item)
             ids.append(id)
         endpoint = api.get_endpoint(name)
-        return ResourceProxyList(endpoint, ids)
+        return cls(endpoint, ids)
 
 
 class ResourceList(object):
@@ -187,6 +315,11 @@ class ResourceList(object):
 
     Endpoint helper for paginated lists.
 
+    Position of the iteration is available as a serializable `cursor`,
+    the iteration can be resumed from it by EndpointProxy.resume.
+    Every iteration, whichever way it is done, starts again at the first page
+    given by `filters`, only EndpointProxy.resume continues from a cursor.
+
     E.g.
         api.mailing.all()
         api.mailing.filter(...)
@@ -194,16 +327,34 @@ class ResourceList(object):
     :param: endpoint: EndpointProxy
     :param: meta: dict
     :param: filters: dict
+    :param: objects: None|list, raw objects of the first page if already fetched
+    :param: end: None|int, offset where the iteration stops, the end of the list if None
     """
-    def __init__(self, endpoint, meta, filters):
+    def __init__(self, endpoint, meta, filters, objects=None, end=None):
         assert isinstance(endpoint, EndpointProxy)
         assert isinstance(meta, dict)
         assert isinstance(filters, dict)
+        assert objects is None or isinstance(objects, list)
         self.endpoint = endpoint
         self._cache = []
         self._is_cached = False
         self._meta = meta
         self._filters = filters
+        self._objects = objects
+        self._prefetch = ()
+        self._read_ahead = 0
+        self._end = end
+        # Offset of the first page, every iteration starts there.
+        self._start = int(meta.get('offset', 0))
+        # Offset of the first not iterated page, None when all the pages are iterated.
+        self._offset = None
+        self._rewind()
+
+    def _rewind(self):
+        """
+        Moves the cursor back to the first page, done when an iteration starts.
+        """
+        self._offset = self._start if self._end is None or self._start < self._end else None
 
     def count(self):
         """
@@ -217,6 +368,154 @@ class ResourceList(object):
     def resource_name(self):
         return self.endpoint.resource_name
 
+    @property
+    def cursor(self):
+        """
+        Returns serializable position of the iteration, it points to the first not iterated page.
+
+        It moves when a page is iterated to the end, pages iterated by iter_parallel move it
+        only when all of them are iterated. It is None when all the resources are iterated.
+
+        E.g. {'resource_name': 'mailing', 'filters': {'kind': 'cms'}, 'offset': 40, 'limit': 20, 'end': None}
+
+        :returns: None|dict
+        """
+        if self._offset is None:
+            return None
+        filters = dict(self._filters)
+        filters.pop('offset', None)
+        filters.pop('limit', None)
+        return {
+            'resource_name': self.resource_name,
+            'filters': filters,
+            'offset': self._offset,
+            'limit': int(self._meta.get('limit') or 0),
+            'end': self._end,
+        }
+
+    def split(self, parts):
+        """
+        Splits not iterated resources into cursors of consecutive page ranges.
+
+        E.g. for worker processes, each of them resumes one cursor by EndpointProxy.resume.
+        The last cursor is open-ended, so resources added meanwhile are not missed.
+
+        :param: parts: int
+        :returns: list(dict)
+        """
+        cursor = self.cursor
+        if cursor is None:
+            return []
+        limit = cursor['limit']
+        end = self.count() if self._end is None else min(self._end, self.count())
+        if not limit or end <= cursor['offset']:
+            return [cursor]
+        pages = (end - cursor['offset'] + limit - 1) // limit
+        step = (pages + parts - 1) // parts * limit
+        starts = list(range(cursor['offset'], end, step))
+        ends = starts[1:] + [self._end]
+        return [dict(cursor, offset=start, end=stop) for start, stop in zip(starts, ends)]
+
+    def _clip_page(self, meta, objects):
+        """
+        Drops objects over the end of the iteration and computes offset of the next page.
+
+        :returns: 2-tuple (list, None|int), objects and offset of the next page, None after the last one
+        """
+        offset = int(meta.get('offset', 0))
+        next_offset = offset + len(objects) if meta.get('next') else None
+        if self._end is not None:
+            objects = objects[:max(0, self._end - offset)]
+            if next_offset is not None and next_offset >= self._end:
+                next_offset = None
+        return objects, next_offset
+
+    def prefetch(self, *fields):
+        """
+        Sets related fields to be fetched in batches for each page.
+
+        E.g. api.mailing.filter(...).prefetch('user', 'profile')
+
+        :returns: ResourceList
+        """
+        self._prefetch = fields
+        return self
+
+    def read_ahead(self, pages=2):
+        """
+        Sets how many next pages should be fetched in background while the current one is iterated.
+
+        E.g. api.mailing.filter(...).read_ahead(2)
+
+        :returns: ResourceList
+        """
+        self._read_ahead = pages
+        return self
+
+    def _manufacture_page(self, objects):
+        """
+        Manufactures page resources and prefetches their related resources.
+
+        :param: objects: list
+        :returns: list(Resource)
+        """
+        resources = self.endpoint.resource_class.manufacture_many(self.endpoint, objects)
+        for field in self._prefetch:
+            ResourceProxy.fetch_many(
+                value for value in (getattr(item, field, None) for item in resources)
+                if isinstance(value, ResourceProxy)
+            )
+        return resources
+
+    def _pop_first_page(self):
+        """
+        Returns raw objects of the already fetched first page.
+
+        They can be used only once, later iterations fetch the first page again.
+
+        :returns: None|list
+        """
+        objects, self._objects = self._objects, None
+        return objects
+
+    def _iterate_pages(self):
+        """
+        Iterates pages, possibly reading them ahead in background.
+
+        The cursor moves when the consumer asks for the next page.
+
+        :yields: list(Resource)
+        """
+        self._rewind()
+        pages = self._follow_pages()
+        if self._read_ahead:
+            pages = _read_ahead(pages, self._read_ahead)
+        for offset, resources in pages:
+            yield resources
+            self._offset = offset
+
+    def _follow_pages(self):
+        """
+        Iterates pages following `next` links.
+
+        :yields: 2-tuple (None|int, list(Resource)), offset of the next page and resources
+        """
+        objects = self._pop_first_page()
+        if objects is not None:
+            data = {'meta': self._meta, 'objects': objects}
+        else:
+            data = self.endpoint.api.get(self.resource_name, **self._filters)
+        while True:
+            objects, offset = self._clip_page(data['meta'], data['objects'])
+            next = data['meta'].get('next')
+            resources = self._manufacture_page(objects)
+            # Drop the raw page before yielding, only one page is kept in memory.
+            data = objects = None
+            yield offset, resources
+            if offset is None:
+                return
+            data = self.endpoint.api.get_by_relative_url(next)
+
     def _fetch(self):
         """
         Used by iteration. Fetches all resources page by page.
@@ -224,31 +523,119 @@ class ResourceList(object):
         :yields: Resource
         """
         self._is_cached = True
-        data = self.endpoint.api.get(self.resource_name, **self._filters)
-        resources = Resource.manufacture_many(self.endpoint, data['objects'])
-        self._cache += resources
-        for item in resources:
-            yield item
-        new_next = data['meta']['next']
-        for item in self._iterate_pages(new_next):
+        for resources in self._iterate_pages():
+            self._cache += resources
+            for item in resources:
+                yield item
+
+    def stream(self):
+        """
+        Iterates resources page by page without caching them.
+
+        Only the current page is kept in memory, use it for walking huge lists.
+        Unless related resources are prefetched or pages read ahead, pages are decoded
+        incrementally and resources are yielded as soon as they are decoded.
+
+        :yields: Resource
+        """
+        if self._prefetch or self._read_ahead:
+            generator = (item for resources in self._iterate_pages() for item in resources)
+        else:
+            generator = self._stream_objects()
+        for item in generator:
             yield item
 
-    def _iterate_pages(self, next):
+    def _stream_objects(self):
         """
-        Iterates pages.
+        Iterates resources of incrementally decoded pages following `next` links.
 
         :yields: Resource
         """
-        if not next:
+        self._rewind()
+        api = self.endpoint.api
+        manufacture = self.endpoint.resource_class.manufacture
+        objects = self._pop_first_page()
+        if objects is None:
+            url = api.get_url(self.resource_name, **self._filters)
+        else:
+            objects, offset = self._clip_page(self._meta, objects)
+            for item in objects:
+                yield manufacture(self.endpoint, item)
+            objects = None
+            self._offset = offset
+            url = '%s%s' % (api.parser.base_url, self._meta['next']) if offset is not None else None
+        while url:
+            page = api.get_stream_by_absolute_url(url)
+            meta = page.meta
+            offset = int(meta.get('offset', 0))
+            for item in page:
+                if self._end is not None and offset >= self._end:
+                    break
+                yield manufacture(self.endpoint, item)
+                offset += 1
+            next = meta.get('next')
+            if not next or (self._end is not None and offset >= self._end):
+                self._offset = url = None
+            else:
+                self._offset = offset
+                url = '%s%s' % (api.parser.base_url, next)
+
+    def _get_page_offsets(self, limit):
+        """
+        Computes offsets of all the pages from the first one, total count and page limit.
+
+        :returns: 2-tuple (dict, list), filters without offset and limit, page offsets
+        """
+        filters = dict(self._filters)
+        filters.pop('offset', None)
+        filters.pop('limit', None)
+        end = self.count() if self._end is None else min(self._end, self.count())
+        return filters, list(range(self._start, end, limit))
+
+    def iter_parallel(self, workers=8, ordered=True):
+        """
+        Iterates resources fetching pages concurrently.
+
+        Page offsets are computed up front from total count and page limit,
+        pages are fetched by a pool of `workers` threads. At most `workers` pages
+        are fetched ahead of the consumer, so a slow consumer does not pile them up in memory.
+        Resources are not cached, the cursor moves only when all of them are iterated.
+
+        :param: workers: int
+        :param: ordered: bool, whether to yield pages in order or as they arrive
+        :yields: Resource
+        """
+        limit = int(self._meta.get('limit') or 0)
+        if not limit:
+            # Unlimited page, everything is on the first one.
+            for resources in self._iterate_pages():
+                for item in resources:
+                    yield item
             return
-        data = self.endpoint.api.get_by_relative_url(next)
-        resources = Resource.manufacture_many(self.endpoint, data['objects'])
-        self._cache += resources
-        for item in resources:
-            yield item
-        new_next = data['meta']['next']
-        for item in self._iterate_pages(new_next):
-            yield item
+        self._rewind()
+        filters, offsets = self._get_page_offsets(limit)
+        start = offsets[0] if offsets else None
+        first_page = self._pop_first_page()
+
+        def fetch_page(offset):
+            if offset == start and first_page is not None:
+                objects = first_page
+            else:
+                objects = self.endpoint.api.get(self.resource_name, offset=offset, limit=limit, **filters)['objects']
+            if self._end is not None:
+                objects = objects[:max(0, self._end - offset)]
+            return self._manufacture_page(objects)
+
+        # Imported on first use, multiprocessing slows down the package import.
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(workers)
+        try:
+            for resources in _imap_bounded(pool, fetch_page, offsets, workers, ordered):
+                for item in resources:
+                    yield item
+        finally:
+            pool.terminate()
+        self._offset = None
 
     def __iter__(self):
         """
@@ -270,24 +657,170 @@ class ResourceList(object):
         )
 
 
+class ResourceChanges(object):
+    """
+    Resources changed since a high-water mark, iterated in stable (`field`, id) order.
+
+    Pages are requested by `field`__gte filter of the last iterated value, not by offset,
+    so resources changed during the sync are not skipped. The mark holds ids of all
+    the resources iterated with the mark value, only they are skipped by the next sync,
+    so a resource changed to the mark value later is not missed.
+    The `mark` moves when a resource is iterated, pass it to the next sync.
+
+    E.g.
+        changes = api.mailing.changes_since(field='modified', **saved_mark)
+        for mailing in changes:
+            store(mailing)
+        saved_mark = changes.mark
+
+    :param: endpoint: EndpointProxy
+    :param: field: str
+    :param: since: mixed, None for all the resources
+    :param: since_ids: None|iterable(native_string_bases|int), ids of the resources iterated with `since` value
+    :param: filters: dict
+    :param: limit: None|int, page size, the api default if None
+    """
+    def __init__(self, endpoint, field, since=None, since_ids=None, filters=None, limit=None):
+        assert isinstance(endpoint, EndpointProxy)
+        self.endpoint = endpoint
+        self.field = field
+        self.filters = filters or {}
+        self.limit = limit
+        if hasattr(since, 'isoformat'):
+            # Compared with the values returned by the api.
+            since = since.isoformat()
+        since_ids = [str(id) for id in since_ids or ()]
+        self._mark = (since, since_ids)
+        # Position of the next page: __gte value, ids of the resources with it iterated or skipped and offset.
+        self._since = since
+        self._since_ids = set(since_ids)
+        self._offset = 0
+        self._is_done = False
+
+    @property
+    def mark(self):
+        """
+        Returns high-water mark of the iterated resources, keyword arguments of the next changes_since.
+
+        :returns: dict
+        """
+        since, since_ids = self._mark
+        return {'since': since, 'since_ids': list(since_ids)}
+
+    def _get_filters(self):
+        """
+        Returns filters of the next page.
+
+        :returns: dict
+        """
+        filters = dict(self.filters)
+        filters['order_by'] = [self.field, 'id']
+        if self._since is not None:
+            filters['%s__gte' % self.field] = self._since
+        if self._offset:
+            filters['offset'] = self._offset
+        if self.limit is not None:
+            filters['limit'] = self.limit
+        return filters
+
+    def _consume_page(self, data):
+        """
+        Returns not yet iterated objects of the page and moves the position past them.
+
+        If all the page objects have the same value, the next page is requested by offset.
+
+        :returns: 2-tuple (list(dict), list(None|tuple)), objects and their (value, id) marks
+        """
+        parser = self.endpoint.api.parser
+        objects = []
+        marks = []
+        last = None
+        last_ids = set()
+        for item in data['objects']:
+            value = item.get(self.field)
+            id = parser.get_resource_ident(item['resource_uri'])[1]
+            if value is not None:
+                if value != last:
+                    last, last_ids = value, set()
+                last_ids.add(id)
+            if value is not None and value == self._since and id in self._since_ids:
+                continue
+            objects.append(item)
+            marks.append(None if value is None else (value, id))
+        if not data['meta']['next']:
+            self._is_done = True
+        elif last is None or last == self._since:
+            self._since_ids |= last_ids
+            self._offset += len(data['objects'])
+        else:
+            self._since, self._since_ids = last, last_ids
+            self._offset = 0
+        return objects, marks
+
+    def _move_mark(self, mark):
+        """
+        Moves the mark past iterated resource.
+
+        :param: mark: None|tuple, (value, id) of the resource
+        """
+        if mark is None:
+            return
+        value, id = mark
+        since, since_ids = self._mark
+        self._mark = (since, since_ids + [id]) if value == since else (value, [id])
+
+    def __iter__(self):
+        """
+        Iterates changed resources.
+
+        :yields: Resource
+        """
+        endpoint = self.endpoint
+        while not self._is_done:
+            data = endpoint.api.get(endpoint.resource_name, **self._get_filters())
+            objects, marks = self._consume_page(data)
+            for resource, mark in zip(endpoint.resource_class.manufacture_many(endpoint, objects), marks):
+                yield resource
+                self._move_mark(mark)
+
+    def __repr__(self):
+        return '<%s %s, %s since %s>' % (
+            self.__class__.__name__,
+            self.endpoint.resource_name,
+            self.field,
+            self._mark[0]
+        )
+
+
 class Resource(object):
     """
     Resource
 
     Its data are available as properties.
+    Related resource URLs are converted to ResourceProxy objects on first access.
+
+    Values are stored in a list, field names are in a layout shared by all
+    the resources with the same fields (see Api.get_field_layout).
 
     E.g. api.mailing.get(1)
 
+    :const: proxy_class: class of related resources
+    :const: proxy_list_class: class of related resource lists
     :param: endpoint: EndpointProxy
-    :param: data: dict
+    :param: data: dict, raw data returned by server
     :param: id: native_string_bases
     """
+    __slots__ = ('endpoint', '_layout', '_values', '_id', '_is_deleted')
+    proxy_class = ResourceProxy
+    proxy_list_class = ResourceProxyList
+
     def __init__(self, endpoint, data, id):
         assert isinstance(endpoint, EndpointProxy)
         assert isinstance(data, dict)
         assert isinstance(id, native_string_bases)
         self.endpoint = endpoint
-        self._data = data
+        self._layout = endpoint.api.get_field_layout(tuple(data))
+        self._values = list(data.values())
         self._id = id
         self._is_deleted = False
 
@@ -296,61 +829,99 @@ class Resource(object):
         return self.endpoint.resource_name
 
     def get_url(self):
-        return self.endpoint.api.get_url(self.name, self._id)
+        return self.endpoint.get_detail_url(self._id)
 
     def __repr__(self):
         return '<%s %s/%s: %s>' % (
             self.__class__.__name__,
             self.name,
             self._id,
-            self._data
+            dict((attr, self._values[index]) for attr, index in self._layout.items() if attr != 'resource_uri')
         )
 
     def __getattr__(self, attr):
         """
-        Returns resource property.
+        Returns resource property, converts related resource URLs on first access.
 
         E.g. api.mailing.get(1).email
 
         :raises: AttributeError
         :returns: mixed
         """
-        if attr in self._data:
-            return self._data[attr]
-        else:
+        if attr in Resource.__slots__:
+            # Not initialized slot, e.g. while unpickling.
+            raise AttributeError(attr)
+        index = self._layout.get(attr)
+        if index is None or attr == 'resource_uri':
             raise AttributeError(attr)
+        value = self._values[index]
+        converted = self._convert(value)
+        if converted is not value:
+            self._values[index] = converted
+        return converted
+
+    def _convert(self, value):
+        """
+        Replaces related resource URL with ResourceProxy and not empty list of them with ResourceProxyList.
+
+        :returns: mixed
+        """
+        parser = self.endpoint.api.parser
+        if parser.is_resource_url(value):
+            return self.proxy_class.manufacture(self.endpoint.api, value)
+        if isinstance(value, list) and value and all(parser.is_resource_url(item) for item in value):
+            return self.proxy_list_class.manufacture(self.endpoint.api, value)
+        return value
 
     def update(self, **kwargs):
         """
         Updates resources by PATCH request and returns updated resource.
 
+        The resource is read from the response if the api returns data (always_return_data),
+        otherwise it is fetched again, lazily with api `lazy_writes`.
+        Inside api.batch() the update is buffered and PendingWrite is returned.
+
         :keyword params: resource fields
         :raises: BadHttpStatus if returned status is not 202
-        :returns: Resource
+        :returns: Resource|ResourceProxy|PendingWrite
         """
         if self._is_deleted:
             raise ResourceDeleted
+        write_buffer = self.endpoint.api._write_buffer
+        if write_buffer is not None:
+            return write_buffer.update(self.endpoint, self._id, kwargs)
         url = self.get_url()
         headers = {'content-type': 'application/json'}
-        response = self.endpoint.api.request(url, request=requests.patch, data=json.dumps(kwargs, cls=JsonLazyEncoder), headers=headers)
+        response = self.endpoint.api.request(url, method='patch', data=self.endpoint.api.encode_body(kwargs), headers=headers)
         logger.debug('Patching data: %s' % kwargs)
         if response.status_code != 202:
             self.endpoint.api.raise_error(response)
+        self.endpoint._forget(self._id)
+        resource = self.endpoint._manufacture_written(response, self._id)
+        if resource is not None:
+            return resource
         return self.endpoint.get(self._id)
 
     def delete(self):
         """
         Deletes resource by DELETE request.
 
+        Inside api.batch() the delete is buffered and PendingWrite is returned.
+
         :raises: BadHttpStatus if returned status is not 204
-        :returns: True
+        :returns: True|PendingWrite
         """
         if self._is_deleted:
             raise ResourceDeleted
+        write_buffer = self.endpoint.api._write_buffer
+        if write_buffer is not None:
+            self._is_deleted = True
+            return write_buffer.delete(self.endpoint, self._id)
         url = self.get_url()
-        response = self.endpoint.api.request(url, request=requests.delete)
+        response = self.endpoint.api.request(url, method='delete')
         if response.status_code != 204:
             self.endpoint.api.raise_error(response)
+        self.endpoint._forget(self._id)
         self._is_deleted = True
         return True
 
@@ -359,7 +930,8 @@ class Resource(object):
         """
         Manufactures Resource from raw data returned by server.
 
-        Replace related resource URLs with ResourceProxy objects.
+        Raw data are kept as they are, they may be shared by the response cache.
+        Related resource URLs are converted when they are read.
 
         :param: endpoint: EndpointProxy
         :param: data: dict
@@ -367,15 +939,8 @@ class Resource(object):
         """
         assert isinstance(endpoint, EndpointProxy)
         assert isinstance(data, dict)
-        url = data['resource_uri']
-        del data['resource_uri']
-        for attr, value in data.items():
-            if endpoint.api.parser.is_resource_url(value):
-                data[attr] = ResourceProxy.manufacture(endpoint.api, value)
-            elif isinstance(value, list):
-                data[attr] = ResourceProxyList.manufacture(endpoint.api, value)
-        resource_name, resource_id = endpoint.api.parser.get_resource_ident(url)
-        return Resource(endpoint, data, resource_id)
+        resource_name, resource_id = endpoint.api.parser.get_resource_ident(data['resource_uri'])
+        return cls(endpoint, data, resource_id)
 
     @classmethod
     def manufacture_many(cls, endpoint, data):
@@ -388,19 +953,32 @@ class Resource(object):
         """
         assert isinstance(endpoint, EndpointProxy)
         assert hasattr(data, '__iter__')
-        return [Resource.manufacture(endpoint, item) for item in data]
+        return [cls.manufacture(endpoint, item) for item in data]
 
 
 class EndpointProxy(object):
     """
     Proxy to resource endpoint
 
+    Endpoint proxies are memoized by Api, its urls are computed once.
+
     E.g. api.mailing
 
+    :const: MAX_URL_LENGTH: Maximal length of `set/` urls, ids are split to more requests over it.
+    :const: BULK_ROWS: How many objects are sent in one list PATCH request.
+    :const: resource_class: class of manufactured resources
+    :const: list_class: class of resource lists
+    :const: changes_class: class of changed resources iterators
     :param: api: Api
     :param: endpoint_url: native_string_bases
     :param: schema_url: native_string_bases
     """
+    MAX_URL_LENGTH = 2000
+    BULK_ROWS = 500
+    resource_class = Resource
+    list_class = ResourceList
+    changes_class = ResourceChanges
+
     def __init__(self, api, endpoint_url, schema_url):
         assert isinstance(api, Api)
         assert isinstance(endpoint_url, native_string_bases)
@@ -410,6 +988,12 @@ class EndpointProxy(object):
         self._schema_url = schema_url
         resource_name_iter = filter(bool, endpoint_url.split('/'))
         self.resource_name = list(resource_name_iter)[-1]
+        self._url = api.get_url(self.resource_name)
+        self._absolute_schema_url = '%s%s' % (api.parser.base_url, schema_url)
+        # Detail url is prefix + id + suffix.
+        self._detail_url_prefix = '%s%s/' % (api.parser.url, self.resource_name)
+        self._detail_url_suffix = '' if api._strip_trailing_slash else '/'
+        self._resource_uri_prefix = urlsplit(self._detail_url_prefix).path
 
     def __repr__(self):
         return '<%s %s>' % (
@@ -423,7 +1007,45 @@ class EndpointProxy(object):
 
         :returns: str
         """
-        return self.api.get_url(self.resource_name)
+        return self._url
+
+    def get_detail_url(self, id):
+        """
+        Returns url of resource with given id.
+
+        :returns: str
+        """
+        return '%s%s%s' % (self._detail_url_prefix, id, self._detail_url_suffix)
+
+    def _recall(self, id):
+        """
+        Returns resource from the api identity map, if there is one.
+
+        :returns: None|Resource
+        """
+        identity_map = self.api.identity_map
+        if identity_map is None:
+            return None
+        return identity_map.get(self.resource_name, id)
+
+    def _remember(self, resources):
+        """
+        Stores resources to the api identity map, if there is one.
+
+        :param: resources: list(Resource)
+        """
+        identity_map = self.api.identity_map
+        if identity_map is not None:
+            for resource in resources:
+                identity_map.set(self.resource_name, resource._id, resource)
+
+    def _forget(self, id):
+        """
+        Removes resource from the api identity map, if there is one.
+        """
+        identity_map = self.api.identity_map
+        if identity_map is not None:
+            identity_map.invalidate(self.resource_name, id)
 
     def get_schema_url(self):
         """
@@ -431,15 +1053,15 @@ class EndpointProxy(object):
 
         :returns: str
         """
-        return '%s%s' % (self.api.parser.base_url, self._schema_url)
+        return self._absolute_schema_url
 
     def get_schema(self):
         """
-        Returns endpoint schema.
+        Returns endpoint schema, from the api schema cache if there is one.
 
         :returns: dict
         """
-        return self.api.get_by_absolute_url(self.get_schema_url())
+        return self.api.get_schema_by_absolute_url(self.get_schema_url())
 
     def get(self, id=None, **kwargs):
         """
@@ -451,8 +1073,13 @@ class EndpointProxy(object):
         :returns: Resource
         """
         if id:
+            resource = None if kwargs else self._recall(id)
+            if resource is not None:
+                return resource
             data = self.api.get(self.resource_name, id, **kwargs)
-            return Resource.manufacture(self, data)
+            resource = self.resource_class.manufacture(self, data)
+            self._remember([resource])
+            return resource
         if not kwargs:
             raise ResourceIdMissing
         list_proxy = self.filter(**kwargs)
@@ -470,11 +1097,98 @@ class EndpointProxy(object):
         :raises: BadHttpStatus if returned status is not 200
         :returns: dict(str(resource id): Resource)
         """
+        resources, ids = self._recall_many(ids)
+        if resources and not ids:
+            return resources
         id = 'set/' + ';'.join(map(str, ids))
         data = self.api.get(self.resource_name, id)
-        resources = Resource.manufacture_many(self, data['objects'])
+        return self._collect_many(resources, data)
+
+    def chunk_ids(self, ids):
+        """
+        Splits ids to chunks, so `set/` url of every chunk fits into MAX_URL_LENGTH.
+
+        :param: ids: iterable
+        :yields: list(str)
+        """
+        base_length = len(self.get_detail_url('set'))
+        chunk = []
+        length = base_length
+        for id in ids:
+            id = str(id)
+            if chunk and length + 1 + len(id) > self.MAX_URL_LENGTH:
+                yield chunk
+                chunk = []
+                length = base_length
+            # Ids are separated by semicolon.
+            length += len(id) + (1 if chunk else 0)
+            chunk.append(id)
+        if chunk:
+            yield chunk
+
+    def _fetch_chunk(self, ids):
+        """
+        Fetches resources of `ids` by get_many.
+
+        :returns: list(2-tuple (str, None|Resource)) in the order of ids
+        """
+        resources = {}
+        for resource in self.get_many(*ids).values():
+            if resource is not None:
+                resources[resource._id] = resource
+        return [(id, resources.get(id)) for id in ids]
+
+    def iter_many(self, ids, workers=1):
+        """
+        Iterates resources specified by ids in their order.
+
+        Ids are fetched in chunks (see chunk_ids), `workers` chunks at once.
+
+        :raises: BadHttpStatus if returned status is not 200
+        :yields: 2-tuple (str(resource id), None|Resource)
+        """
+        chunks = list(self.chunk_ids(ids))
+        if len(chunks) < 2 or workers < 2:
+            pages = (self._fetch_chunk(chunk) for chunk in chunks)
+            pool = None
+        else:
+            from multiprocessing.pool import ThreadPool
+            pool = ThreadPool(min(workers, len(chunks)))
+            pages = pool.imap(self._fetch_chunk, chunks)
+        try:
+            for page in pages:
+                for item in page:
+                    yield item
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+    def _recall_many(self, ids):
+        """
+        Splits ids to resources found in the identity map and ids to fetch.
+
+        :returns: 2-tuple (dict(resource id: Resource), list)
+        """
+        resources = {}
+        missing = []
+        for id in ids:
+            resource = self._recall(id)
+            if resource is None:
+                missing.append(id)
+            else:
+                resources[resource.id] = resource
+        return resources, missing
+
+    def _collect_many(self, resources, data):
+        """
+        Adds resources of a `set/` response to `resources`.
+
+        :returns: dict(resource id: Resource)
+        """
+        fetched = self.resource_class.manufacture_many(self, data['objects'])
+        self._remember(fetched)
         # Transform a list of Resource in a dict using resource ID as key
-        resources = dict([(r.id, r) for r in resources])
+        resources.update((r.id, r) for r in fetched)
         # Add not found IDs to the dict
         if 'not_found' in data:
             for id in data['not_found']:
@@ -502,38 +1216,243 @@ class EndpointProxy(object):
         :returns: SearchResponse
         """
         data = self.api.get(self.resource_name, **kwargs)
-        meta = data['meta']
-        return ResourceList(self, meta, kwargs)
+        return self.list_class(self, data['meta'], kwargs, data['objects'])
+
+    def changes_since(self, since=None, field='modified', since_ids=None, limit=None, **kwargs):
+        """
+        Returns resources changed since the high-water mark, for incremental sync.
+
+        Resources are filtered by `field`__gte and ordered by `field` and id,
+        so both have to be allowed for filtering and ordering on the api side.
+        Resources are requested when iterated.
+
+        E.g.
+        changes = api.mailing.changes_since(since='2014-01-01T00:00:00', field='modified')
+        list(changes)
+        changes.mark -> {'since': '2014-03-01T12:00:00', 'since_ids': ['129', '131']}
+        api.mailing.changes_since(field='modified', **changes.mark)
+
+        :param: since: mixed, e.g. datetime or ISO string, all the resources if None
+        :param: field: str, modification timestamp field
+        :param: since_ids: None|list, from the mark of the previous sync
+        :param: limit: None|int, page size
+        :keyword params: other filters
+        :returns: ResourceChanges
+        """
+        return self.changes_class(self, field, since, since_ids, kwargs, limit)
+
+    def resume(self, cursor):
+        """
+        Returns resources list continuing at cursor of another, possibly deserialized, ResourceList.
+
+        E.g. api.mailing.resume(json.loads(saved_cursor))
+
+        :raises: BadHttpStatus if returned status is not 200
+        :returns: ResourceList
+        """
+        filters = self._get_cursor_filters(cursor)
+        data = self.api.get(self.resource_name, **filters)
+        return self.list_class(self, data['meta'], filters, data['objects'], end=cursor['end'])
+
+    def _get_cursor_filters(self, cursor):
+        """
+        Returns filters of the first page of the cursor.
+
+        :returns: dict
+        """
+        assert cursor['resource_name'] == self.resource_name
+        filters = dict(cursor['filters'])
+        filters['offset'] = cursor['offset']
+        filters['limit'] = cursor['limit']
+        return filters
+
+    def count(self, **kwargs):
+        """
+        Returns count of resources matching the filter.
+
+        Asks for a single row page, so no full page is downloaded.
+        Note that TastyPie treats limit=0 as "no limit".
+
+        :raises: BadHttpStatus if returned status is not 200
+        :returns: int
+        """
+        kwargs['limit'] = 1
+        data = self.api.get(self.resource_name, **kwargs)
+        return int(data['meta']['total_count'])
 
     def add(self, **kwargs):
         """
         Adds resource to this endpoint and returns it.
 
         Issues POST to endpoint url with resource parameters given as **kwargs.
+        The resource is read from the response if the api returns data (always_return_data),
+        otherwise it is fetched from the Location, lazily with api `lazy_writes`.
+        Inside api.batch() the add is buffered and PendingWrite is returned.
 
         :raises: BadHttpStatus if returned status is not 201
-        :returns: Resource
+        :returns: Resource|ResourceProxy|PendingWrite
         """
+        if self.api._write_buffer is not None:
+            return self.api._write_buffer.add(self, kwargs)
         url = self.get_url()
         headers = {'content-type': 'application/json'}
-        response = self.api.request(url, request=requests.post, data=json.dumps(kwargs, cls=JsonLazyEncoder), headers=headers)
+        response = self.api.request(url, method='post', data=self.api.encode_body(kwargs), headers=headers)
         logger.debug('Posting data: %s' % kwargs)
         if response.status_code != 201:
             self.api.raise_error(response)
-        data = self.api.get_by_absolute_url(response.headers['location'])
-        return Resource.manufacture(self, data)
+        location = response.headers['location']
+        resource = self._manufacture_written(response, self.api.parser.get_resource_ident(location)[1])
+        if resource is not None:
+            return resource
+        data = self.api.get_by_absolute_url(location)
+        return self.resource_class.manufacture(self, data)
+
+    def _manufacture_written(self, response, id):
+        """
+        Returns resource written by POST or PATCH request without fetching it.
+
+        Resource is manufactured from the response data (always_return_data),
+        without data, ResourceProxy is returned if the api has `lazy_writes`.
+
+        :returns: None|Resource|ResourceProxy, None if the resource has to be fetched
+        """
+        data = self.api.decode_body(response)
+        if data:
+            resource = self.resource_class.manufacture(self, data)
+            self._remember([resource])
+            return resource
+        if self.api.lazy_writes:
+            return self.resource_class.proxy_class(self, id)
+        return None
+
+    def get_resource_uri(self, id):
+        """
+        Returns resource uri (url path) of resource with given id.
+
+        :returns: str
+        """
+        return '%s%s%s' % (self._resource_uri_prefix, id, self._detail_url_suffix)
+
+    def _patch_list(self, objects, deleted_objects):
+        """
+        Issues PATCH to endpoint url, TastyPie creates or updates `objects` and deletes `deleted_objects`.
+
+        :param: objects: list(dict)
+        :param: deleted_objects: list(str), resource uris
+        :raises: BadHttpStatus if returned status is not 202
+        :returns: list(Resource) if the api returns data (always_return_data), otherwise []
+        """
+        data = {'objects': objects}
+        if deleted_objects:
+            data['deleted_objects'] = deleted_objects
+        url = self.get_url()
+        headers = {'content-type': 'application/json'}
+        response = self.api.request(url, method='patch', data=self.api.encode_body(data), headers=headers)
+        logger.debug('Patching list: %s objects, %s deleted objects' % (len(objects), len(deleted_objects)))
+        if response.status_code != 202:
+            self.api.raise_error(response)
+        data = self.api.decode_body(response)
+        if not data or 'objects' not in data:
+            return []
+        return self.resource_class.manufacture_many(self, data['objects'])
+
+    def _bulk_patch(self, objects=(), deleted_objects=()):
+        """
+        Issues list PATCH requests of at most BULK_ROWS objects.
+
+        :returns: list(Resource) if the api returns data (always_return_data), otherwise []
+        """
+        objects = list(objects)
+        deleted_objects = list(deleted_objects)
+        resources = []
+        for offset in range(0, len(objects), self.BULK_ROWS):
+            resources += self._patch_list(objects[offset:offset + self.BULK_ROWS], [])
+        for offset in range(0, len(deleted_objects), self.BULK_ROWS):
+            self._patch_list([], deleted_objects[offset:offset + self.BULK_ROWS])
+        return resources
+
+    def bulk_add(self, objects):
+        """
+        Adds more resources to this endpoint by list PATCH requests.
+
+        E.g. api.mailing.bulk_add([{'customer': '1'}, {'customer': '2'}])
+
+        :param: objects: iterable(dict), resource fields
+        :raises: BadHttpStatus if returned status is not 202
+        :returns: list(Resource) if the api returns data (always_return_data), otherwise []
+        """
+        return self._bulk_patch(objects=objects)
+
+    def bulk_update(self, changes):
+        """
+        Updates more resources of this endpoint by list PATCH requests.
+
+        E.g. api.mailing.bulk_update({1: {'customer': '999'}, 2: {'customer': '998'}})
+
+        :param: changes: dict|iterable(2-tuple), resource id or Resource to resource fields
+        :raises: BadHttpStatus if returned status is not 202
+        :returns: list(Resource) if the api returns data (always_return_data), otherwise []
+        """
+        if isinstance(changes, dict):
+            changes = changes.items()
+        objects = []
+        for id, fields in changes:
+            if isinstance(id, Resource):
+                id = id._id
+            item = dict(fields)
+            item['resource_uri'] = self.get_resource_uri(id)
+            objects.append(item)
+            self._forget(id)
+        return self._bulk_patch(objects=objects)
+
+    def bulk_delete(self, *ids):
+        """
+        Deletes more resources of this endpoint by list PATCH requests.
+
+        E.g. api.mailing.bulk_delete(1, 2, 3)
+
+        :param: ids: resource ids or Resources
+        :raises: BadHttpStatus if returned status is not 202
+        :returns: True
+        """
+        self._bulk_patch(deleted_objects=self._get_deleted_objects(ids))
+        return True
+
+    def _get_deleted_objects(self, ids):
+        """
+        Returns resource uris of deleted resources, marks them deleted.
+
+        :param: ids: resource ids or Resources
+        :returns: list(str)
+        """
+        uris = []
+        for id in ids:
+            if isinstance(id, Resource):
+                id._is_deleted = True
+                id = id._id
+            uris.append(self.get_resource_uri(id))
+            self._forget(id)
+        return uris
 
 
 class Parser(object):
     """
     Service url parser.
 
+    Resource urls are matched by one precompiled pattern built from the known endpoints,
+    so they are classified and split at once. Resource names and ids are interned
+    and results for the recent urls are memoized.
+
+    :const: MEMO_SIZE: How many recent urls are memoized.
     :param: url: native_string_bases
     """
+    MEMO_SIZE = 10000
+
     def __init__(self, url):
         assert isinstance(url, native_string_bases)
         self.url = url
         self.base_url, self.base_path = self._get_url_parts(url)
+        self.set_endpoints(())
 
     def _get_url_parts(self, url):
         """
@@ -548,13 +1467,44 @@ class Parser(object):
         proto, host, path = urlsplit(url)[0:3]
         return '%s://%s' % (proto, host), path
 
+    def set_endpoints(self, names):
+        """
+        Compiles the resource url pattern for endpoint `names`, any name matches if there are none.
+
+        Resource urls may be absolute and may miss the trailing slash (strip_trailing_slash).
+
+        :param: names: iterable(str)
+        """
+        names = sorted(names, key=len, reverse=True)
+        name_pattern = '|'.join(re.escape(name) for name in names) if names else '[^/]+'
+        self._pattern = re.compile(r'^(?:[a-z][a-z0-9+.-]*://[^/]+)?%s(%s)/([^/?#]+)/?$' % (
+            re.escape(self.base_path.rstrip('/') + '/'),
+            name_pattern
+        ))
+        self._idents = {}
+
+    def parse(self, url):
+        """
+        Returns (resource_name, resource_id) of resource `url`, None if it is not resource url.
+
+        :returns: None|2-tuple (str, str)
+        """
+        ident = self._idents.get(url)
+        if ident is None:
+            match = self._pattern.match(url)
+            ident = (intern(match.group(1)), intern(match.group(2))) if match else False
+            if len(self._idents) >= self.MEMO_SIZE:
+                self._idents.clear()
+            self._idents[url] = ident
+        return ident or None
+
     def is_resource_url(self, url):
         """
         Returns True if `url` is a valid resource URL
 
         :returns: bool
         """
-        return isinstance(url, native_string_bases) and url.startswith(self.base_path)
+        return isinstance(url, native_string_bases) and url.startswith(self.base_path) and self.parse(url) is not None
 
     def get_resource_ident(self, url):
         """
@@ -566,7 +1516,11 @@ class Parser(object):
         :returns: 2-tuple (str, str)
         """
         assert isinstance(url, native_string_bases)
-        return url.split('/')[-3:-1]
+        ident = self.parse(url)
+        if ident is None:
+            # Url out of the service, e.g. Location of another host.
+            ident = tuple(url.rstrip('/').split('/')[-2:])
+        return ident
 
 
 class _Logger():
@@ -583,9 +1537,14 @@ class Api(object):
     Supposed to be REST api client, but uses some advantages of TastyPie which other REST apis do not implement.
 
     E.g. api = Api('http://127.0.0.1:8000/api/v1/', auth=('martin', '***'))
+
+    :const: endpoint_class: class of endpoint proxies
+    :const: STREAM_CHUNK_SIZE: Size of response chunks decoded incrementally.
     """
+    endpoint_class = EndpointProxy
+    STREAM_CHUNK_SIZE = 64 * 1024
 
-    def __init__(self, service_url, serializer=None, auth=None, config={}, debug=False, load_endpoints=True, strip_trailing_slash=False, **kwargs):
+    def __init__(self, service_url, serializer=None, auth=None, config={}, debug=False, load_endpoints=True, strip_trailing_slash=False, transport=None, identity_map=None, response_cache=None, lazy_writes=False, schema_cache=None, retry_policy=None, rate_limiter=None, **kwargs):
         """
         :param service_url: native_string_bases
         :param serializer: None|SerializerInterface
@@ -594,13 +1553,28 @@ class Api(object):
             config dict directly passed to requests
         :param debug: bool                               DEPRECATED
         :param load_endpoints: bool
-            whether to load endpoints (TastyPie feature) on initialization
+            whether to load endpoints (TastyPie feature), they are loaded lazily on first endpoint access
         :param strip_trailing_slash: bool
             whether to strip trailing slashes in urls, e.g.
                 http://127.0.0.1:8000/api/v1/mailings/ vs.
                 http://127.0.0.1:8000/api/v1/mailings
             TastyPie api supports trailing slashes (django uses interface for redirecting from "non-slashed" url to "slashed")
             Other clients does not have to support trailing slashes
+        :param transport: None|TransportInterface
+            transport used for all the HTTP requests, pooled keep-alive SessionTransport by default
+        :param identity_map: None|IdentityMap
+            cache of fetched resources shared by all the endpoints, resources are fetched again if None
+        :param response_cache: None|ResponseCacheInterface
+            cache of decoded responses revalidated by ETag/Last-Modified conditional requests
+        :param lazy_writes: bool
+            whether add and update return ResourceProxy fetched on first read instead of fetching the written
+            resource at once, used only when the api does not return data (always_return_data)
+        :param schema_cache: None|SchemaCache
+            cache of the endpoint list and endpoint schemas, they are fetched on every load if None
+        :param retry_policy: None|RetryPolicy
+            retries of failed idempotent requests, failed requests are not retried if None
+        :param rate_limiter: None|RateLimiter
+            client-side limit of requests per second, it can be shared by more apis
         :param kwargs: **dict
             kwargs directly passed to requests
         """
@@ -612,9 +1586,28 @@ class Api(object):
         self._serializer = serializer or JsonSerializer()
         self._strip_trailing_slash = strip_trailing_slash
         assert isinstance(self._serializer, SerializerInterface)
-        if load_endpoints:
-            # The API endpoint should return resource endpoints list.
-            self._endpoints = self.get()
+        # Writes are always sent as JSON.
+        self._json_serializer = self._serializer if isinstance(self._serializer, JsonSerializer) else JsonSerializer()
+        self._transport = transport or SessionTransport()
+        assert isinstance(self._transport, TransportInterface)
+        assert identity_map is None or isinstance(identity_map, IdentityMap)
+        self.identity_map = identity_map
+        assert response_cache is None or isinstance(response_cache, ResponseCacheInterface)
+        self._response_cache = response_cache
+        # Write buffers entered by the thread, the last one is active.
+        self._local = threading.local()
+        self._field_layouts = {}
+        self.lazy_writes = lazy_writes
+        assert schema_cache is None or isinstance(schema_cache, SchemaCache)
+        self._schema_cache = schema_cache
+        assert retry_policy is None or isinstance(retry_policy, RetryPolicy)
+        self._retry_policy = retry_policy
+        assert rate_limiter is None or isinstance(rate_limiter, RateLimiter)
+        self._rate_limiter = rate_limiter
+        # None until endpoints are loaded on first access.
+        self._endpoints = None if load_endpoints else {}
+        self._endpoints_lock = threading.Lock()
+        self._endpoint_proxies = {}
 
     def __getattr__(self, name):
         """
@@ -624,20 +1617,93 @@ class Api(object):
 
         :returns: EndpointProxy
         """
+        if name.startswith('_'):
+            # Not initialized private attribute.
+            raise AttributeError(name)
         return self.get_endpoint(name)
 
+    def _get_write_buffers(self):
+        """
+        Returns stack of write buffers entered by the current thread.
+
+        :returns: list(WriteBuffer)
+        """
+        buffers = getattr(self._local, 'write_buffers', None)
+        if buffers is None:
+            buffers = self._local.write_buffers = []
+        return buffers
+
+    def _push_write_buffer(self, buffer):
+        """
+        Activates entered write buffer.
+        """
+        self._get_write_buffers().append(buffer)
+
+    def _pop_write_buffer(self, buffer):
+        """
+        Deactivates exited write buffer, overlapping batches do not have to exit in order.
+        """
+        buffers = self._get_write_buffers()
+        if buffer in buffers:
+            buffers.remove(buffer)
+
+    @property
+    def _write_buffer(self):
+        """
+        Returns write buffer active in the current thread.
+
+        :returns: None|WriteBuffer
+        """
+        buffers = self._get_write_buffers()
+        return buffers[-1] if buffers else None
+
+    def batch(self, flush_every=500, flush_interval=None):
+        """
+        Returns context manager buffering adds, updates and deletes into list PATCH requests.
+
+        The buffer is active only in the thread which entered it, writes of the other threads
+        are sent right away.
+
+        E.g.
+        with api.batch(flush_every=500):
+            api.mailing.get(1).update(customer='999')
+
+        :raises: BatchWriteError on exit if some of the writes failed
+        :returns: WriteBuffer
+        """
+        return WriteBuffer(self, flush_every=flush_every, flush_interval=flush_interval)
+
+    def get_field_layout(self, names):
+        """
+        Returns field layout shared by all the resources with the same fields.
+
+        :param: names: tuple, field names in the order of values
+        :returns: dict, field name -> index of its value
+        """
+        layout = self._field_layouts.get(names)
+        if layout is None:
+            layout = self._field_layouts.setdefault(names, dict((name, index) for index, name in enumerate(names)))
+        return layout
+
     def get_endpoint(self, name):
         """
         Returns endpoint proxy object for desired resource.
 
+        Proxies are created once and reused.
+
         E.g.
         api.get_endpoint('mailing') -> EndpointProxy to 'http://127.0.0.1:8000/api/v1/mailing'
 
         :returns: EndpointProxy
         """
         assert isinstance(name, native_string_bases)
-        if name in self._endpoints:
-            return EndpointProxy(self, self._endpoints[name]['list_endpoint'], self._endpoints[name]['schema'])
+        endpoint = self._endpoint_proxies.get(name)
+        if endpoint is not None:
+            return endpoint
+        endpoints = self._get_endpoints_data()
+        if name in endpoints:
+            endpoint = self.endpoint_class(self, endpoints[name]['list_endpoint'], endpoints[name]['schema'])
+            return self._endpoint_proxies.setdefault(name, endpoint)
         else:
             raise AttributeError(name)
 
@@ -654,7 +1720,29 @@ class Api(object):
 
         :returns: dict(unicode, EndpointProxy)
         """
-        return dict((item, self.get_endpoint(item)) for item in self._endpoints.keys())
+        return dict((item, self.get_endpoint(item)) for item in self._get_endpoints_data().keys())
+
+    def load_endpoints(self):
+        """
+        Loads endpoints (TastyPie feature), from the schema cache if there is one.
+        """
+        # The API endpoint should return resource endpoints list.
+        endpoints = self.get_schema_by_absolute_url(self.get_url())
+        self._endpoint_proxies = {}
+        self.parser.set_endpoints(endpoints)
+        self._endpoints = endpoints
+
+    def _get_endpoints_data(self):
+        """
+        Returns endpoints list, loads it on first call.
+
+        :returns: dict
+        """
+        if self._endpoints is None:
+            with self._endpoints_lock:
+                if self._endpoints is None:
+                    self.load_endpoints()
+        return self._endpoints
 
     def get_url(self, resource_name=None, resource_id=None, **kwargs):
         """Generate an URL
@@ -667,11 +1755,12 @@ class Api(object):
 
         :returns: str
         """
-        url = self.parser.url
-        if resource_name is not None:
-            url += '%s/' % resource_name
-            if resource_id is not None:
-                url += '%s/' % resource_id
+        if resource_name is None:
+            url = self.parser.url
+        elif resource_id is None:
+            url = '%s%s/' % (self.parser.url, resource_name)
+        else:
+            url = '%s%s/%s/' % (self.parser.url, resource_name, resource_id)
         if self._strip_trailing_slash:
             url = url.strip('/')
         if kwargs:
@@ -684,29 +1773,147 @@ class Api(object):
                         params.append((key, value_item.encode('utf-8')))
                     else:
                         params.append((key, value_item))
-            url += '?' + urllib.urlencode(params)
+            url += '?' + urlencode(params)
         return url
 
-    def request(self, url, request=requests.get, data=None, headers=None):
+    def request(self, url, method='get', data=None, headers=None, stream=False, request=None):
         """
-        Does the request.
+        Does the request through the transport.
+
+        Waits for the rate limiter and retries failed request by the retry policy, if there are any.
 
+        :param method: str, HTTP method name
+        :param stream: bool, whether to defer downloading of the response body
+        :param request: None|function, deprecated, requests.get, requests.post etc. instead of `method`,
+            requests functions are accepted also as `method`
+        :raises: ValueError if the request function is not one of requests
         :returns: requests.models.Response
         """
-        return request(url, auth=self._request_auth, data=data, headers=headers, **self._request_kwargs)
+        if request is not None:
+            method = request
+        if callable(method):
+            if method not in _LEGACY_REQUESTS:
+                raise ValueError('%r is not a requests method function, pass a method name' % (method,))
+            warnings.warn('Pass a method name to Api.request instead of a requests function', DeprecationWarning, stacklevel=2)
+            method = _LEGACY_REQUESTS[method]
+        kwargs = dict(self._request_kwargs)
+        if stream:
+            kwargs['stream'] = True
+        policy = self._retry_policy
+        attempt = 0
+        while True:
+            if self._rate_limiter is not None:
+                self._rate_limiter.acquire()
+            try:
+                response = self._transport.request(method, url, auth=self._request_auth, data=data, headers=headers, **kwargs)
+            except Exception as e:
+                if policy is None or not policy.should_retry(method, attempt, error=e):
+                    raise
+                delay = policy.get_delay(attempt)
+                logger.debug('Retrying %s %s in %.2fs: %s' % (method, url, delay, e))
+            else:
+                if policy is None or not policy.should_retry(method, attempt, response=response):
+                    return response
+                delay = policy.get_delay(attempt, response)
+                logger.debug('Retrying %s %s in %.2fs: [%s]' % (method, url, delay, response.status_code))
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        """
+        Releases pooled connections held by the transport.
+        """
+        self._transport.close()
 
     def get_by_absolute_url(self, url):
         """
         Does GET request by url and if successful, decodes it.
 
+        With response cache, the request is conditional and not modified responses
+        are served from the cache without decoding.
+
+        :returns: dict
+        """
+        assert isinstance(url, native_string_bases)
+        cached, headers = self._get_cached_response(url)
+        response = self.request(url, headers=headers)
+        return self._decode_response(url, response, cached)
+
+    def _get_cached_response(self, url):
+        """
+        Returns cached response and conditional request headers for it.
+
+        :returns: 2-tuple (None|CachedResponse, None|dict)
+        """
+        cached = self._response_cache.get(url) if self._response_cache is not None else None
+        if cached is None:
+            return None, None
+        headers = {}
+        if cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+        return cached, headers
+
+    def _decode_response(self, url, response, cached):
+        """
+        Decodes GET response, serves not modified responses from the cache.
+
+        :raises: BadHttpStatus if returned status is not 200 (or 304 of a cached response)
+        :returns: dict
+        """
+        if response.status_code == 304 and cached is not None:
+            return cached.payload
+        if response.status_code != 200:
+            self.raise_error(response)
+        payload = self._serializer.decode_bytes(response.content)
+        if self._response_cache is not None:
+            etag = response.headers.get('etag')
+            last_modified = response.headers.get('last-modified')
+            if etag or last_modified:
+                self._response_cache.set(url, CachedResponse(etag, last_modified, payload))
+        return payload
+
+    def get_schema_by_absolute_url(self, url):
+        """
+        Returns endpoint list or schema by url, from the schema cache if there is one.
+
         :returns: dict
         """
+        if self._schema_cache is None:
+            return self.get_by_absolute_url(url)
+        data = self._schema_cache.get(self.parser.url, url)
+        if data is None:
+            data = self.get_by_absolute_url(url)
+            self._schema_cache.set(self.parser.url, url, data)
+        return data
+
+    def get_stream_by_absolute_url(self, url):
+        """
+        Does GET request by url of a list and if successful, decodes it incrementally while downloading.
+
+        Response cache is not used.
+
+        :returns: ListStream
+        """
         assert isinstance(url, native_string_bases)
-        response = self.request(url)
+        response = self.request(url, stream=True)
         if response.status_code != 200:
             self.raise_error(response)
-        response.enconding = 'utf8'
-        return self._serializer.decode(response.text)
+        return self._serializer.decode_stream(self._iter_content(response))
+
+    def _iter_content(self, response):
+        """
+        Iterates response body chunks, releases the connection when done.
+
+        :yields: bytes
+        """
+        try:
+            for chunk in response.iter_content(self.STREAM_CHUNK_SIZE):
+                yield chunk
+        finally:
+            response.close()
 
     def get_by_relative_url(self, url):
         """
@@ -727,6 +1934,24 @@ class Api(object):
         url = self.get_url(resource_name, resource_id, **kwargs)
         return self.get_by_absolute_url(url)
 
+    def decode_body(self, response):
+        """
+        Decodes response body.
+
+        :returns: None|dict, None if the body is empty
+        """
+        if not response.content:
+            return None
+        return self._serializer.decode_bytes(response.content)
+
+    def encode_body(self, data):
+        """
+        Encodes request body of writes, always JSON.
+
+        :returns: bytes
+        """
+        return self._json_serializer.encode_bytes(data)
+
     def raise_error(self, response):
         """
         Raises error.
@@ -736,13 +1961,11 @@ class Api(object):
         :raises: BadHttpStatus
         """
         assert isinstance(response, requests.models.Response)
-        response.enconding = 'utf8'
-        content = response.text
         try:
-            data = self._serializer.decode(content)
+            data = self._serializer.decode_bytes(response.content)
             message = data.get('error_message', '')
         except ValueError:
-            message = content
+            message = response.text
         message = '[%s] %s' % (response.status_code, message)
         raise BadHttpStatus(message, response=response)
 
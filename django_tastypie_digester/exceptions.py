@@ -34,3 +34,11 @@ class BadHttpStatus(HttpError):
 
 class ResourceDeleted(ApiError):
     """Resource has been deleted - some operations are forbidden"""
+
+
+class BatchWriteError(ApiError):
+    """Some of the buffered writes failed"""
+
+    def __init__(self, message='', response=None, errors=None):
+        super(BatchWriteError, self).__init__(message, response=response)
+        self.errors = errors or []
@@ -0,0 +1,120 @@
+"""Retry and rate limiting policies"""
+
+import random
+import threading
+import time
+from email.utils import mktime_tz, parsedate_tz
+
+import requests
+
+# time.monotonic is not available in python 2.
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class RetryPolicy(object):
+    """
+    Retries failed idempotent requests with exponential backoff and full jitter.
+
+    Requests are retried on `statuses` and on `exceptions` raised by the transport.
+    The delay before n-th retry is random between 0 and `backoff` * 2 ** n seconds,
+    at most `max_backoff`. Retry-After header of the response is respected instead,
+    also at most `max_backoff`.
+
+    :param: retries: int, how many times a request is retried
+    :param: backoff: float
+    :param: max_backoff: float
+    :param: statuses: iterable(int)
+    :param: methods: iterable(str), idempotent methods which can be retried
+    :param: exceptions: tuple(type)
+    """
+    def __init__(self, retries=3, backoff=0.5, max_backoff=30.0, statuses=(429, 502, 503, 504),
+                 methods=('get', 'head', 'options'), exceptions=(requests.ConnectionError, requests.Timeout)):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = frozenset(statuses)
+        self.methods = frozenset(method.lower() for method in methods)
+        self.exceptions = exceptions
+
+    def should_retry(self, method, attempt, response=None, error=None):
+        """
+        Returns whether `attempt`-th (from 0) request, which ended with `response` or `error`, should be retried.
+
+        :returns: bool
+        """
+        if attempt >= self.retries or method.lower() not in self.methods:
+            return False
+        if error is not None:
+            return isinstance(error, self.exceptions)
+        return response.status_code in self.statuses
+
+    def get_delay(self, attempt, response=None):
+        """
+        Returns how many seconds to wait before retrying `attempt`-th request.
+
+        :returns: float
+        """
+        retry_after = self._get_retry_after(response)
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _get_retry_after(self, response):
+        """
+        Parses Retry-After header given in seconds or as HTTP date.
+
+        :returns: None|float
+        """
+        value = response.headers.get('Retry-After') if response is not None else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        date = parsedate_tz(value)
+        if date is None:
+            return None
+        return max(0.0, mktime_tz(date) - time.time())
+
+
+class RateLimiter(object):
+    """
+    Token bucket rate limiter, thread-safe, can be shared by more apis.
+
+    Tokens are added at `rate` per second, up to `burst` of them.
+    Every request takes one token and waits until it is available.
+
+    :param: rate: float, requests per second
+    :param: burst: None|float, bucket size, `rate` (at least 1) if None
+    """
+    def __init__(self, rate, burst=None):
+        assert rate > 0
+        self.rate = float(rate)
+        self.burst = float(burst) if burst is not None else max(1.0, self.rate)
+        self._tokens = self.burst
+        self._updated = _clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Takes a token, possibly one which will be added in the future.
+
+        :returns: float, how many seconds to wait for the token
+        """
+        with self._lock:
+            now = _clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """
+        Takes a token, waits until it is available.
+        """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
@@ -1,33 +1,152 @@
 """Serializers"""
 
 import sys
+import codecs
 import datetime
 import json
+import re
+from collections import deque
 
 
 class JsonLazyEncoder(json.JSONEncoder):
     """
     Encodes django's lazy i18n strings.
     Used to serialize translated strings to JSON, because simplejson chokes on it otherwise.
+
+    Dates, times, UUIDs and enums are encoded as by orjson, which encodes them natively,
+    so the output does not depend on whether orjson is installed.
+
+    Django is not imported with the digester, but on the first object
+    the native encoder can not encode. If django is not installed, the object is not encodable.
     """
     def default(self, obj):
-        from django.utils.encoding import force_unicode
-        from django.utils.functional import Promise
-        if isinstance(obj, Promise):
-            return force_unicode(obj)
-        return obj
-
-# JsonLazyEncoder supports encoding of django translation lazy objects
-# If django is not installed, native json.JSONEncoder is used instead
+        if isinstance(obj, (datetime.date, datetime.time)):
+            return obj.isoformat()
+        import enum
+        import uuid
+        if isinstance(obj, uuid.UUID):
+            return str(obj)
+        if isinstance(obj, enum.Enum):
+            return obj.value
+        django_lazy = _get_django_lazy()
+        if django_lazy is not None:
+            promise, force_text = django_lazy
+            if isinstance(obj, promise):
+                return force_text(obj)
+        return super(JsonLazyEncoder, self).default(obj)
+
+
+# Resolved by _get_django_lazy, False if django is not installed.
+_django_lazy = None
+
+
+def _get_django_lazy():
+    """
+    Returns django's lazy object class and its text conversion, imports django on first call.
+
+    :returns: None|2-tuple (Promise, callable)
+    """
+    global _django_lazy
+    if _django_lazy is None:
+        try:
+            from django.utils.functional import Promise
+        except ImportError:
+            _django_lazy = False
+        else:
+            try:
+                from django.utils.encoding import force_unicode as force_text
+            except ImportError:
+                from django.utils.encoding import force_str as force_text
+            _django_lazy = (Promise, force_text)
+    return _django_lazy or None
+
+# orjson is optional faster JSON engine
+# If it is not installed, native json is used instead
 try:
-    import django
+    import orjson
 except ImportError:
-    JsonLazyEncoder = json.JSONEncoder
+    orjson = None
+
+
+class ListStream(object):
+    """
+    Decoded list response, its objects are decoded while iterated.
+
+    Top level values (like `meta`) are available as soon as they are decoded.
+    Reading a value placed after the objects buffers the objects decoded meanwhile.
+
+    :param: events: iterable of 2-tuples (key, value),
+        ('objects', object) for each list object, (key, value) for the other top level values
+    """
+    def __init__(self, events):
+        self._events = iter(events)
+        self._values = {}
+        self._objects = deque()
+
+    def _pull(self):
+        """
+        Decodes next event.
+
+        :raises: StopIteration at the end of the document
+        """
+        key, value = next(self._events)
+        if key == 'objects':
+            self._objects.append(value)
+        else:
+            self._values[key] = value
+
+    def get(self, key, default=None):
+        """
+        Returns top level value, decodes the document until it is found.
+
+        :returns: mixed
+        """
+        while key not in self._values:
+            try:
+                self._pull()
+            except StopIteration:
+                return default
+        return self._values[key]
+
+    @property
+    def meta(self):
+        return self.get('meta', {})
+
+    def __iter__(self):
+        """
+        Iterates list objects.
+
+        :yields: dict
+        """
+        while True:
+            while self._objects:
+                yield self._objects.popleft()
+            try:
+                self._pull()
+            except StopIteration:
+                return
+
+
+def _dict_events(data):
+    """
+    Returns ListStream events of already decoded list response.
+
+    :yields: 2-tuple (key, value)
+    """
+    for key, value in data.items():
+        if key == 'objects':
+            for item in value:
+                yield key, item
+        else:
+            yield key, value
 
 
 class SerializerInterface(object):
     """
     Any custom serializer has to implement this api.
+
+    `encode_bytes`, `decode_bytes` and `decode_stream` are optional,
+    by default they are implemented by `encode` and `decode` of UTF-8 text.
     """
     def encode(self, data):
         raise NotImplementedError
@@ -35,17 +154,207 @@ class SerializerInterface(object):
     def decode(self, data):
         raise NotImplementedError
 
+    def encode_bytes(self, data):
+        """
+        Encodes data to bytes.
+
+        :returns: bytes
+        """
+        return self.encode(data).encode('utf-8')
+
+    def decode_bytes(self, data):
+        """
+        Decodes bytes, e.g. raw response content.
+
+        :returns: mixed
+        """
+        return self.decode(data.decode('utf-8'))
+
+    def decode_stream(self, chunks):
+        """
+        Decodes list response given as iterable of byte chunks.
+
+        :returns: ListStream
+        """
+        return ListStream(_dict_events(self.decode(b''.join(chunks).decode('utf-8'))))
+
 
 class JsonSerializer(SerializerInterface):
     """
     Simple JSON serializer
+
+    Bytes are encoded and decoded by orjson, if it is installed. Native json is used
+    for what orjson handles differently, integers over 64 bits and NaN or Infinity,
+    so the results do not depend on whether orjson is installed.
+
+    :param: fast: bool, whether to use orjson if it is installed
     """
+    # Numbers of at least 19 digits can be over 64 bits, or strings with such digits.
+    LONG_DIGITS = re.compile(b'[0-9]{19}')
+
+    def __init__(self, fast=True):
+        self._orjson = orjson if fast else None
+
     def encode(self, data):
         return json.dumps(data)
 
     def decode(self, data):
         return json.loads(data)
 
+    def encode_bytes(self, data):
+        """
+        Encodes data to UTF-8 JSON, supports django's lazy i18n strings.
+
+        :returns: bytes
+        """
+        if self._orjson is not None:
+            # Dataclasses are passed to default, so they are not encodable as with native json.
+            option = self._orjson.OPT_NON_STR_KEYS | self._orjson.OPT_PASSTHROUGH_DATACLASS
+            try:
+                return self._orjson.dumps(data, default=JsonLazyEncoder().default, option=option)
+            except TypeError:
+                # E.g. integers over 64 bits, native json handles them.
+                pass
+        return json.dumps(data, cls=JsonLazyEncoder).encode('utf-8')
+
+    def decode_bytes(self, data):
+        """
+        Decodes UTF-8 JSON.
+
+        :returns: mixed
+        """
+        # orjson decodes integers over 64 bits to floats, they are found by digits count.
+        if self._orjson is not None and not self.LONG_DIGITS.search(data):
+            try:
+                return self._orjson.loads(data)
+            except self._orjson.JSONDecodeError:
+                # E.g. NaN, which native json accepts.
+                pass
+        return json.loads(data.decode('utf-8'))
+
+    def decode_stream(self, chunks):
+        """
+        Decodes list response incrementally, list objects are decoded one by one.
+
+        :returns: ListStream
+        """
+        return ListStream(_json_list_events(chunks))
+
+
+class _JsonStreamReader(object):
+    """
+    Reads JSON values from a stream of UTF-8 byte chunks.
+
+    :param: chunks: iterable(bytes)
+    """
+    WHITESPACE = re.compile(r'[ \t\n\r]*')
+    DELIMITERS = ' \t\n\r,:]}'
+    decoder = json.JSONDecoder()
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def read(self):
+        """
+        Appends next chunk to the buffer, drops the already consumed part of the buffer.
+
+        :returns: bool, False at the end of the stream
+        """
+        while not self.eof:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self.eof = True
+                text = self._text_decoder.decode(b'', True)
+            else:
+                text = self._text_decoder.decode(chunk)
+            if text:
+                self.buffer = self.buffer[self.pos:] + text
+                self.pos = 0
+                return True
+        return False
+
+    def peek(self):
+        """
+        Skips whitespace and returns the next character, '' at the end of the stream.
+
+        :returns: str
+        """
+        while True:
+            self.pos = self.WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read():
+                return ''
+
+    def expect(self, chars):
+        """
+        Consumes the next character, which has to be one of `chars`.
+
+        :raises: ValueError
+        :returns: str
+        """
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError('Expecting one of %r at position %d, got %r' % (chars, self.pos, char))
+        self.pos += 1
+        return char
+
+    def value(self):
+        """
+        Decodes the next JSON value.
+
+        A value is accepted only if it is followed by a delimiter or the end of the stream.
+        Otherwise it may continue in the next chunk, e.g. number 1.5 split after "1",
+        so it is decoded again with more data.
+
+        :raises: ValueError
+        :returns: mixed
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if self.read():
+                    continue
+                raise
+            if (end == len(self.buffer) or self.buffer[end] not in self.DELIMITERS) and self.read():
+                continue
+            self.pos = end
+            return value
+
+
+def _json_list_events(chunks):
+    """
+    Decodes JSON object incrementally, items of its `objects` list one by one.
+
+    :yields: 2-tuple (key, value), see ListStream
+    """
+    reader = _JsonStreamReader(chunks)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key == 'objects' and reader.peek() == '[':
+            reader.expect('[')
+            if reader.peek() == ']':
+                reader.expect(']')
+            else:
+                while True:
+                    yield key, reader.value()
+                    if reader.expect(',]') == ']':
+                        break
+        else:
+            yield key, reader.value()
+        if reader.expect(',}') == '}':
+            return
+
 
 ########################
 # following functions copied from:
@@ -153,20 +462,42 @@ def _str_to_boolean(bool_str):
 def _from_xml(el, strict):
     """
     Extracts value of xml element element `el`.
+
+    The tree is walked by an explicit stack, so deep documents
+    do not hit the recursion limit.
+    """
+    values = {}
+    stack = [(el, False)]
+    while stack:
+        node, visited = stack.pop()
+        if len(node) and not visited:
+            stack.append((node, True))
+            stack.extend((child, False) for child in node)
+            continue
+        values[node] = _node_from_xml(node, [values.pop(child) for child in node], strict)
+    return values[el]
+
+def _node_from_xml(el, children, strict):
+    """
+    Extracts value of xml element `el` of already extracted `children` values.
+
+    If not `strict`, TastyPie's `type="list"` and `type="null"` attributes are honored.
     """
     val = None
     # Parent node.
-    if el:
-        if _is_xml_el_dict(el):
-            val = _dict_from_xml(el, strict)
+    if len(el):
+        if not strict and el.get('type') == 'list':
+            val = children
+        elif _is_xml_el_dict(el):
+            val = dict((child.tag, child_val) for child, child_val in zip(el, children))
         elif _is_xml_el_list(el):
-            val = _list_from_xml(el, strict)
+            val = {el[0].tag: children}
     # Simple node.
     else:
         attribs = el.items()
         # An element with attributes.
         if attribs and strict:
-            val = dict(('@%s' % k, v) for k, v in dict(attribs).iteritems())
+            val = dict(('@%s' % k, v) for k, v in attribs)
             if el.text:
                 converted = _val_and_maybe_convert(el)
                 val['#text'] = el.text
@@ -176,7 +507,10 @@ def _from_xml(el, strict):
             # An element with no subelements but text.
             val = _val_and_maybe_convert(el)
         elif attribs:
-            val = dict(attribs)
+            if el.get('type') == 'list':
+                val = []
+            elif el.get('type') != 'null':
+                val = dict(attribs)
     return val
 
 def _val_and_maybe_convert(el):
@@ -196,33 +530,80 @@ _val_and_maybe_convert.convertors = {
     'integer': int
 }
 
-def _list_from_xml(els, strict):
+class XmlSerializer(SerializerInterface):
     """
-    Converts xml elements list `el_list` to a python list.
+    Simple XML serializer
     """
-    res = []
-    tag = els[0].tag
-    for el in els:
-        res.append(_from_xml(el, strict))
-    return {tag: res}
+    def encode(self, data):
+        return dict_to_xml(data)
+
+    def decode(self, data):
+        """
+        Decodes TastyPie response to the same shape as JSON one.
+
+        The root element is dropped and values are extracted in TastyPie mode (not strict),
+        as by `decode_stream`, use `xml_to_dict` for the strict shape.
+
+        :returns: dict
+        """
+        import xml.etree.cElementTree as ElementTree
+        return _from_xml(ElementTree.XML(data), False)
+
+    def decode_bytes(self, data):
+        # ElementTree decodes the document by its own encoding declaration.
+        return self.decode(data)
+
+    def decode_stream(self, chunks):
+        """
+        Decodes list response incrementally by iterparse, <object> by <object>.
+
+        Values are extracted in TastyPie mode (not strict), so that they have
+        the same shape as JSON ones.
 
-def _dict_from_xml(els, strict):
+        :returns: ListStream
+        """
+        return ListStream(_xml_list_events(chunks))
+
+
+class _ChunksFile(object):
     """
-    Converts xml doc with root `root` to a python dict.
+    Read-only file-like object over iterable of byte chunks.
     """
-    # An element with subelements.
-    res = {}
-    for el in els:
-        res[el.tag] = _from_xml(el, strict)
-    return res
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b''
 
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._chunks)
+            except StopIteration:
+                break
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
 
-class XmlSerializer(SerializerInterface):
-    """
-    Simple XML serializer
+
+def _xml_list_events(chunks):
     """
-    def encode(self, data):
-        return dict_to_xml(data)
+    Decodes XML document incrementally, items of its `objects` list one by one.
 
-    def decode(self, data):
-        return xml_to_dict(data)
\ No newline at end of file
+    Processed elements are removed from the tree, so only the current
+    object is held in memory.
+
+    :yields: 2-tuple (key, value), see ListStream
+    """
+    import xml.etree.cElementTree as ElementTree
+    path = []
+    for event, el in ElementTree.iterparse(_ChunksFile(chunks), events=('start', 'end')):
+        if event == 'start':
+            path.append(el)
+            continue
+        path.pop()
+        if len(path) == 2 and path[1].tag == 'objects':
+            yield 'objects', _from_xml(el, False)
+            path[1].remove(el)
+        elif len(path) == 1 and el.tag != 'objects':
+            yield el.tag, _from_xml(el, False)
+            path[0].remove(el)
\ No newline at end of file
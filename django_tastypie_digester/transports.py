@@ -0,0 +1,52 @@
+"""Transports"""
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TransportInterface(object):
+    """
+    Any custom transport has to implement this api.
+    """
+    def request(self, method, url, **kwargs):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SessionTransport(TransportInterface):
+    """
+    Transport backed by requests.Session.
+
+    Connections are pooled per host and kept alive between requests.
+    By default connecting times out after 5 seconds and reading after 60 seconds
+    without data, so a stalled connection does not block forever.
+
+    :param: pool_connections: int, how many per-host pools to cache
+    :param: pool_maxsize: int, how many connections to keep in one host pool
+    :param: keep_alive: bool
+    :param: timeout: None|float|tuple, default timeout passed to requests, (connect, read) seconds, None for no timeout
+    """
+    DEFAULT_TIMEOUT = (5.0, 60.0)
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, keep_alive=True, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+
+    def request(self, method, url, **kwargs):
+        """
+        Does the request.
+
+        :returns: requests.models.Response
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def close(self):
+        self.session.close()
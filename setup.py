@@ -5,5 +5,9 @@ setup(
     name="django_tastypie_digester",
     version='0.1.0',
     packages=find_packages(),
-    install_requires=['requests>=2.3.0']
+    install_requires=['requests>=2.3.0'],
+    extras_require={
+        'async': ['aiohttp>=3.0'],
+        'fast': ['orjson'],
+    }
 )
\ No newline at end of file
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import json
+import random
+import unittest
+
+from django_tastypie_digester.serializers import JsonSerializer
+
+DOCUMENTS = [
+    b'{"meta": {"limit": 2, "next": null, "offset": 0, "total_count": 2}, "objects": [{"id": 1}, {"id": 2}]}',
+    b'{"objects": [1.5, -20, 3e10, 0.25E-3, 1234567890123, true, false, null], "meta": {"total_count": 8}}',
+    b'{ "meta" : { "total_count" : 0 } , "objects" : [ ] }',
+    b'{"objects":[{"name":"\\u017elu\\u0165ou\\u010dk\\u00fd \\"k\\u016f\\u0148\\"","tags":["a","b"]},'
+    b'{"name":"\xc5\xbelu\xc5\xa5ou\xc4\x8dk\xc3\xbd","nested":{"list":[[1,2],[3.25]],"empty":{}}}],"count":2.0}',
+    b'{"meta": {"next": "/api/v1/mailing/?offset=2"}, "objects": ["text", 12.5e-1, {"a": [1, {"b": 2}]}]}',
+    b'{}',
+]
+
+
+def decode(chunks):
+    """
+    Decodes chunks by the incremental decoder to the shape of json.loads.
+    """
+    stream = JsonSerializer(fast=False).decode_stream(chunks)
+    objects = list(stream)
+    data = dict(stream._values)
+    if objects or 'objects' in json.loads(b''.join(chunks).decode('utf-8')):
+        data['objects'] = objects
+    return data
+
+
+def split(document, points):
+    points = sorted(points)
+    return [document[start:end] for start, end in zip([0] + points, points + [len(document)])]
+
+
+class JsonStreamTest(unittest.TestCase):
+    def test_whole_document(self):
+        for document in DOCUMENTS:
+            self.assertEqual(decode([document]), json.loads(document.decode('utf-8')))
+
+    def test_every_split_point(self):
+        for document in DOCUMENTS:
+            expected = json.loads(document.decode('utf-8'))
+            for point in range(1, len(document)):
+                chunks = split(document, [point])
+                self.assertEqual(decode(chunks), expected, chunks)
+
+    def test_byte_chunks(self):
+        for document in DOCUMENTS:
+            chunks = [document[i:i + 1] for i in range(len(document))]
+            self.assertEqual(decode(chunks), json.loads(document.decode('utf-8')))
+
+    def test_random_split_points(self):
+        generator = random.Random(0)
+        for _ in range(500):
+            document = generator.choice(DOCUMENTS)
+            points = generator.sample(range(1, len(document)), min(len(document) - 1, generator.randint(1, 8)))
+            chunks = split(document, points)
+            self.assertEqual(decode(chunks), json.loads(document.decode('utf-8')), chunks)
+
+    def test_number_split_before_fraction(self):
+        stream = JsonSerializer(fast=False).decode_stream([b'{"objects": [1.', b'5]}'])
+        self.assertEqual(list(stream), [1.5])
+
+    def test_invalid_document(self):
+        for document in (b'{"objects": [1.5.2]}', b'{"objects": [1, 2}', b'{"meta": tru}'):
+            for point in range(1, len(document)):
+                with self.assertRaises(ValueError):
+                    decode(split(document, [point]))
+
+
+if __name__ == '__main__':
+    unittest.main()